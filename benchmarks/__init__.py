@@ -0,0 +1,16 @@
+"""Benchmarks for PocketFlow's orchestration overhead.
+
+Each case measures the cost the framework adds around user code (node
+hops, batch items, task fan-out, flow copies, memory per run) and
+returns metrics where lower is better, so runs can be compared for
+regressions. See ``python -m benchmarks --help``.
+"""
+
+CASES = {}
+
+def case(fn):
+    """Register a benchmark case. It takes ``scale`` and returns ``{metric: (value, unit)}``."""
+    CASES[fn.__name__] = fn
+    return fn
+
+from . import cases  # noqa: E402,F401  (registers the cases)
@@ -0,0 +1,94 @@
+"""Run PocketFlow's benchmarks and compare results against a baseline.
+
+Usage:
+    python -m benchmarks [CASE ...] [--scale S] [--json OUT] [--compare BASE] [--threshold T]
+    python -m benchmarks --compare BASE --against NEW
+
+Save a baseline on the main branch with ``--json base.json``, then run
+with ``--compare base.json`` on a change to pocketflow/__init__.py. The
+exit status is 1 if any metric got slower by more than the threshold.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from benchmarks import CASES
+
+def run(names, scale, log=print):
+    results = {}
+    for name in names:
+        t0 = time.perf_counter()
+        for metric, (value, unit) in CASES[name](scale).items():
+            results[f"{name}.{metric}"] = {"value": value, "unit": unit}
+            log(f"{name + '.' + metric:<40}{value:14.1f}  {unit}")
+        log(f"  ({name} took {time.perf_counter() - t0:.1f}s)")
+    return results
+
+def meta(scale):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "commit": commit,
+            "scale": scale, "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def compare(base, new, threshold):
+    """Return ``(rows, regressions)`` for metrics present in both result sets."""
+    rows, regressions = [], []
+    for key, b in base["results"].items():
+        n = new["results"].get(key)
+        if n is None or not b["value"]:
+            continue
+        ratio = n["value"] / b["value"]
+        status = "SLOWER" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else ""
+        rows.append((key, b["value"], n["value"], b["unit"], ratio, status))
+        if status == "SLOWER":
+            regressions.append(key)
+    return rows, regressions
+
+def print_comparison(rows):
+    print(f"{'metric':<40}{'base':>14}{'new':>14}  {'unit':<9}{'ratio':>7}")
+    for key, b, n, unit, ratio, status in rows:
+        print(f"{key:<40}{b:14.1f}{n:14.1f}  {unit:<9}{ratio:7.2f}  {status}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cases", nargs="*", metavar="CASE", help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply problem sizes, e.g. 0.1 for a quick run")
+    parser.add_argument("--json", metavar="OUT", help="write results to this file")
+    parser.add_argument("--compare", metavar="BASE", help="compare against results saved with --json")
+    parser.add_argument("--against", metavar="NEW", help="compare BASE with this file instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+    if args.against:
+        if not args.compare:
+            parser.error("--against needs --compare")
+        new = json.loads(Path(args.against).read_text())
+    else:
+        new = {"meta": meta(args.scale), "results": run(args.cases or list(CASES), args.scale)}
+        if args.json:
+            Path(args.json).write_text(json.dumps(new, indent=2))
+    if not args.compare:
+        return 0
+    base = json.loads(Path(args.compare).read_text())
+    if base["meta"].get("scale") != new["meta"].get("scale"):
+        print(f"warning: comparing scale {base['meta'].get('scale')} with {new['meta'].get('scale')}", file=sys.stderr)
+    rows, regressions = compare(base, new, args.threshold)
+    print_comparison(rows)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
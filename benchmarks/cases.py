@@ -0,0 +1,126 @@
+"""Benchmark cases. Every metric is a cost: lower is better."""
+
+import asyncio
+import copy
+import gc
+import timeit
+import tracemalloc
+
+from pocketflow import Node, Flow, BatchNode, AsyncNode, AsyncFlow, AsyncParallelBatchNode
+from benchmarks import case
+
+class Count(Node):
+    def post(self, shared, prep_res, exec_res):
+        shared["n"] += 1
+        return "loop" if shared["n"] < shared["hops"] else "done"
+
+class AsyncCount(AsyncNode):
+    async def post_async(self, shared, prep_res, exec_res):
+        shared["n"] += 1
+        return "loop" if shared["n"] < shared["hops"] else "done"
+
+def loop_flow(node_cls, flow_cls):
+    a, b, end = node_cls(), node_cls(), Node()
+    a - "loop" >> b
+    b - "loop" >> a
+    a - "done" >> end
+    b - "done" >> end
+    return flow_cls(start=a)
+
+def best(fn, repeat=5):
+    gc.collect()
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+@case
+def flow_hop(scale):
+    """Per-hop cost of Flow._orch, uncompiled vs. compiled."""
+    hops = max(100, int(100_000 * scale))
+    out = {}
+    for name, flow in (("uncompiled", loop_flow(Count, Flow)), ("compiled", loop_flow(Count, Flow).compile())):
+        out[name] = (best(lambda: flow.run({"n": 0, "hops": hops})) / hops * 1e9, "ns/hop")
+    return out
+
+@case
+def async_flow_hop(scale):
+    """Per-hop cost of AsyncFlow._orch_async, uncompiled vs. compiled."""
+    hops = max(100, int(50_000 * scale))
+    out = {}
+    for name, flow in (("uncompiled", loop_flow(AsyncCount, AsyncFlow)), ("compiled", loop_flow(AsyncCount, AsyncFlow).compile())):
+        out[name] = (best(lambda: asyncio.run(flow.run_async({"n": 0, "hops": hops}))) / hops * 1e9, "ns/hop")
+    return out
+
+@case
+def batch_node_item(scale):
+    """Per-item cost of BatchNode._exec around a no-op exec()."""
+    class Noop(BatchNode):
+        def exec(self, item):
+            return item
+    items, node = list(range(max(100, int(200_000 * scale)))), Noop()
+    return {"item": (best(lambda: node._exec(items)) / len(items) * 1e9, "ns/item")}
+
+@case
+def parallel_batch_scaling(scale, latency=0.001):
+    """AsyncParallelBatchNode from 10 to 100k items, each exec sleeping ``latency`` seconds.
+
+    ``overhead_N`` is the wall time beyond one ``latency`` spread over the
+    N items, i.e. the per-item scheduling cost once I/O fully overlaps.
+    """
+    class Sleepy(AsyncParallelBatchNode):
+        async def exec_async(self, item):
+            await asyncio.sleep(latency)
+            return item
+    out = {}
+    for n in (10, 100, 1_000, 10_000, 100_000):
+        if n > max(10, 100_000 * scale):
+            break
+        items, node = list(range(n)), Sleepy()
+        wall = best(lambda: asyncio.run(node._exec(items)), repeat=3)
+        out[f"wall_{n}"] = (wall * 1e3, "ms")
+        out[f"overhead_{n}"] = (max(0.0, wall - latency) / n * 1e6, "us/item")
+    return out
+
+@case
+def nested_flow_copy(scale, depth=20):
+    """Cost of running and of copying a chain of ``depth`` nested flows."""
+    flow = Node()
+    for _ in range(depth):
+        flow = Flow(start=flow)
+    runs = max(10, int(5_000 * scale))
+    run = best(lambda: [flow.run({}) for _ in range(runs)]) / runs
+    copies = best(lambda: [copy.copy(flow) for _ in range(runs)]) / runs
+    return {"run": (run * 1e6, "us/run"), "copy": (copies * 1e9, "ns/copy"), "per_level": (run / depth * 1e9, "ns/level")}
+
+@case
+def memory_per_run(scale):
+    """Traced memory held by each in-flight AsyncFlow run parked inside a node."""
+    n = max(10, int(10_000 * scale))
+
+    class Park(AsyncNode):
+        async def exec_async(self, gate):
+            await gate.wait()
+
+        async def prep_async(self, shared):
+            return shared["gate"]
+
+    first = Park()
+    first >> Park()
+    flow = AsyncFlow(start=first).compile()
+
+    async def main():
+        gate = asyncio.Event()
+        tasks = [asyncio.ensure_future(flow.run_async({"gate": gate})) for _ in range(n)]
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        used = tracemalloc.get_traced_memory()[0]
+        gate.set()
+        await asyncio.gather(*tasks)
+        return used
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        used = asyncio.run(main())
+    finally:
+        tracemalloc.stop()
+    return {"bytes": ((used - base) / n, "B/run")}
@@ -1,8 +1,79 @@
-import asyncio, warnings, copy, time
+import asyncio, warnings, time, random, contextvars, contextlib, threading, uuid
+from concurrent import futures
 
+_threads,_threads_lock=[None],threading.Lock()
+def thread_pool(max_workers=None):
+    p=_threads[0]
+    if p is not None and (not max_workers or p._max_workers==max_workers): return p
+    with _threads_lock:
+        p=_threads[0]
+        if p is None or (max_workers and p._max_workers!=max_workers):
+            if p: p.shutdown(wait=False)
+            p=_threads[0]=futures.ThreadPoolExecutor(max_workers,thread_name_prefix="pocketflow")
+        return p
+
+class Tracer:
+    def on_node_start(self,node): pass
+    def on_node_end(self,node,action,timings,error): pass
+    def on_retry(self,node,attempt,exc,delay): pass
+    def on_fallback(self,node,exc): pass
+    def on_transition(self,flow,node,action,nxt): pass
+
+_tracer=contextvars.ContextVar("pocketflow_tracer",default=None)
+@contextlib.contextmanager
+def trace(tracer):
+    tok=_tracer.set(tracer)
+    try: yield tracer
+    finally: _tracer.reset(tok)
+
+def _traced(node,t,shared,run=None):
+    t.on_node_start(node); tm,a,err,c={},None,None,time.perf_counter; s=c()
+    try:
+        p=node.prep(shared); tm["prep"]=(s1:=c())-s
+        if run: a=run(p); tm["exec"]=c()-s1; return a
+        e=node._exec(p); tm["exec"]=(s2:=c())-s1; a=node.post(shared,p,e); tm["post"]=c()-s2; return a
+    except BaseException as x: err=x; raise
+    finally: tm["total"]=c()-s; t.on_node_end(node,a,tm,err)
+
+class RunContext:
+    __slots__=("node","params","cur_retry","run_id","deadline")
+    def __init__(self,node,params,run_id=None,deadline=None): self.node,self.params,self.cur_retry,self.run_id,self.deadline=node,params,0,run_id or uuid.uuid4().hex,deadline
+    def __repr__(self): return f"RunContext(node={type(self.node).__name__}, params={self.params!r}, cur_retry={self.cur_retry}, run_id={self.run_id!r}, deadline={self.deadline!r})"
+    def remaining(self): return None if self.deadline is None else max(0.0,self.deadline-time.monotonic())
+    def fork(self): return RunContext(self.node,self.params,self.run_id,self.deadline)
+
+_run=contextvars.ContextVar("pocketflow_run",default=None)
+def _child(node,params,timeout=None):
+    c=_run.get(); rid,dl=(c.run_id,c.deadline) if c else (None,None)
+    if timeout: dl=min(dl,time.monotonic()+timeout) if dl is not None else time.monotonic()+timeout
+    return RunContext(node,params,rid,dl)
+def _bound(node): r=_run.get(); return r is not None and r.node is node
+def _here(node): r=_run.get(); return r if r is not None and r.node is node else _child(node,node._params)
+def _within(ctx,fn,*args):
+    tok=_run.set(ctx)
+    try: return fn(*args)
+    finally: _run.reset(tok)
+async def _within_async(ctx,fn,*args):
+    tok=_run.set(ctx)
+    try: return await fn(*args)
+    finally: _run.reset(tok)
+def _hop(node,params,fn,*args): return _within(_child(node,params),fn,*args)
+async def _hop_async(node,params,fn,*args): return await _within_async(_child(node,params),fn,*args)
+def _tracking(flow): ck=flow.checkpointer; return ck if ck is not None and ck.flow is flow else None
+
+_hooks=("offload","retry","timeout","cache","throttle","checkpointer","overlay","coalesce","scheduler")
 class BaseNode:
-    def __init__(self): self.params,self.successors={},{}
-    def set_params(self,params): self.params=params
+    __slots__=("_params","successors","max_retries","wait","start_node","_plan",*_hooks,"__weakref__")
+    def __init__(self):
+        self._params,self.successors={},{}
+        for h in _hooks: BaseNode.__dict__[h].__set__(self,None)
+    @property
+    def params(self): r=_run.get(); return r.params if r is not None and r.node is self else self._params
+    @params.setter
+    def params(self,params): self._params=params
+    @property
+    def ctx(self): return _here(self)
+    def set_params(self,params): self._params=params
     def next(self,node,action="default"):
         if action in self.successors: warnings.warn(f"Overwriting successor for action '{action}'")
         self.successors[action]=node; return node
@@ -10,10 +81,15 @@ class BaseNode:
     def exec(self,prep_res): pass
     def post(self,shared,prep_res,exec_res): pass
     def _exec(self,prep_res): return self.exec(prep_res)
-    def _run(self,shared): p=self.prep(shared); e=self._exec(p); return self.post(shared,p,e)
+    def _run(self,shared):
+        t=_tracer.get()
+        if t: return _traced(self,t,shared)
+        p=self.prep(shared); e=self._exec(p); return self.post(shared,p,e)
     def run(self,shared): 
         if self.successors: warnings.warn("Node won't run successors. Use Flow.")  
-        return self._run(shared)
+        tok=_run.set(_child(self,self._params))
+        try: return self._run(shared)
+        finally: _run.reset(tok)
     def __rshift__(self,other): return self.next(other)
     def __sub__(self,action):
         if isinstance(action,str): return _ConditionalTransition(self,action)
@@ -23,78 +99,297 @@ class _ConditionalTransition:
     def __init__(self,src,action): self.src,self.action=src,action
     def __rshift__(self,tgt): return self.src.next(tgt,self.action)
 
+class Retry:
+    def __init__(self,base=1,factor=2,max_delay=60,jitter=True,max_elapsed=None,retry_on=(Exception,)):
+        self.base,self.factor,self.max_delay,self.jitter,self.max_elapsed,self.retry_on=base,factor,max_delay,jitter,max_elapsed,retry_on
+    def hint(self,exc):
+        h=getattr(exc,"retry_after",None)
+        if h is None: h=(getattr(getattr(exc,"response",None),"headers",None) or {}).get("retry-after")
+        try: return None if h is None else max(0.0,float(h))
+        except (TypeError,ValueError): return None
+    def delay(self,attempt,exc,elapsed):
+        if not isinstance(exc,self.retry_on): return None
+        d=self.hint(exc)
+        if d is None: d=min(self.max_delay,self.base*self.factor**attempt); d=random.uniform(0,d) if self.jitter else d
+        return None if self.max_elapsed is not None and elapsed+d>self.max_elapsed else d
+
 class Node(BaseNode):
-    def __init__(self,max_retries=1,wait=0): super().__init__(); self.max_retries,self.wait=max_retries,wait
+    __slots__=()
+    def __init__(self,max_retries=1,wait=0,retry=None,timeout=None,cache=None,coalesce=None):
+        super().__init__(); self.max_retries,self.wait=max_retries,wait
+        if retry is not None: self.retry=retry
+        if timeout is not None: self.timeout=timeout
+        if cache is not None: self.cache=cache
+        if coalesce is not None: self.coalesce=coalesce
+    @property
+    def cur_retry(self): r=_run.get(); return r.cur_retry if r is not None and r.node is self else 0
     def exec_fallback(self,prep_res,exc): raise exc
+    def _call(self,prep_res):
+        if not self.timeout: return self.exec(prep_res)
+        f,ctx=futures.Future(),contextvars.copy_context()
+        def attempt():
+            try: f.set_result(ctx.run(self.exec,prep_res))
+            except BaseException as e: f.set_exception(e)
+        threading.Thread(target=attempt,name="pocketflow-timeout",daemon=True).start()
+        try: return f.result(self.timeout)
+        except futures.TimeoutError: raise TimeoutError(f"{type(self).__name__} timed out after {self.timeout}s") from None
+    def _delay(self,exc,run,t0):
+        d=self.retry.delay(run.cur_retry,exc,time.monotonic()-t0) if self.retry else self.wait
+        return None if d is not None and run.deadline is not None and time.monotonic()+d>=run.deadline else d
     def _exec(self,prep_res):
-        for self.cur_retry in range(self.max_retries):
-            try: return self.exec(prep_res)
+        run=_run.get()
+        if run is None or run.node is not self: return _hop(self,self._params,Node._exec,self,prep_res)
+        if self.cache is not None:
+            k=self.cache.key(self,prep_res); hit,v=self.cache.get(k)
+            if hit: return v
+        t0=time.monotonic()
+        for run.cur_retry in range(self.max_retries):
+            try: r=self._call(prep_res)
             except Exception as e:
-                if self.cur_retry==self.max_retries-1: return self.exec_fallback(prep_res,e)
-                if self.wait>0: time.sleep(self.wait)
+                d,t=None if run.cur_retry==self.max_retries-1 else self._delay(e,run,t0),_tracer.get()
+                if d is None:
+                    if t: t.on_fallback(self,e)
+                    return self.exec_fallback(prep_res,e)
+                if t: t.on_retry(self,run.cur_retry,e,d)
+                if d>0: time.sleep(d)
+                continue
+            if self.cache is not None: self.cache.set(k,r)
+            return r
 
 class BatchNode(Node):
-    def _exec(self,items): return [super(BatchNode,self)._exec(i) for i in (items or [])]
+    __slots__=()
+    def _exec(self,items):
+        if not _bound(self): return _hop(self,self._params,BatchNode._exec,self,items)
+        return [super(BatchNode,self)._exec(i) for i in (items or [])]
+
+class _Plan:
+    __slots__=("nodes","asyn","acts","jump","loose")
+    def __init__(self,start):
+        nodes,ids=[start],{id(start):0}
+        for n in nodes:
+            for t in n.successors.values():
+                if not isinstance(t,BaseNode): raise TypeError(f"Successor {t!r} of {type(n).__name__} is not a node")
+                if id(t) not in ids: ids[id(t)]=len(nodes); nodes.append(t)
+        self.nodes,self.asyn=tuple(nodes),tuple(isinstance(n,AsyncNode) for n in nodes)
+        self.acts={a:k for k,a in enumerate(dict.fromkeys(a for n in nodes for a in n.successors))}
+        self.jump=tuple(tuple(ids[id(n.successors[a])] if a in n.successors else -1 for a in self.acts) for n in nodes)
+        self.loose=tuple(bool(n.successors) for n in nodes)
+    def step(self,i,action):
+        k=self.acts.get(action or "default",-1); j=self.jump[i][k] if k>=0 else -1
+        if j<0 and self.loose[i]: warnings.warn(f"Flow ends: '{action}' not found in {list(self.nodes[i].successors)}")
+        return j
 
 class Flow(BaseNode):
-    def __init__(self,start=None): super().__init__(); self.start_node=start
-    def start(self,start): self.start_node=start; return start
+    __slots__=()
+    def __init__(self,start=None): super().__init__(); self.start_node,self._plan=start,None
+    def start(self,start): self.start_node,self._plan=start,None; return start
+    def compile(self):
+        if self.start_node is None: raise ValueError("Flow has no start node")
+        self._plan=_Plan(self.start_node)
+        for n in self._plan.nodes:
+            if isinstance(n,Flow): n.compile()
+        return self
+    def validate(self,strict=True):
+        from .graph import validate
+        return validate(self,strict)
     def get_next_node(self,curr,action):
         nxt=curr.successors.get(action or "default")
         if not nxt and curr.successors: warnings.warn(f"Flow ends: '{action}' not found in {list(curr.successors)}")
         return nxt
-    def _orch(self,shared,params=None):
-        curr,p,last_action =copy.copy(self.start_node),(params or {**self.params}),None
-        while curr: curr.set_params(p); last_action=curr._run(shared); curr=copy.copy(self.get_next_node(curr,last_action))
-        return last_action
+    def _orch(self,shared,params=None,key=None):
+        p,last_action,pl,t,ck,i=(params or {**self.params}),None,self._plan,_tracer.get(),_tracking(self),0
+        if ck: pl=pl or ck.plan(self); i,last_action,p=ck.start(self,key,p)
+        run=_child(self,p); tok,rid,dl=_run.set(run),run.run_id,run.deadline
+        try:
+            if pl:
+                while i>=0:
+                    n=pl.nodes[i]; _run.set(RunContext(n,p,rid,dl)); last_action=n._run(shared); i=pl.step(i,last_action)
+                    if t: t.on_transition(self,n,last_action,pl.nodes[i] if i>=0 else None)
+                    if ck: ck.hop(self,shared,key,p,i,last_action)
+                return last_action
+            curr=self.start_node
+            while curr:
+                _run.set(RunContext(curr,p,rid,dl)); last_action=curr._run(shared); nxt=self.get_next_node(curr,last_action)
+                if t: t.on_transition(self,curr,last_action,nxt)
+                curr=nxt
+            return last_action
+        finally: _run.reset(tok)
     def _run(self,shared): p=self.prep(shared); o=self._orch(shared); return self.post(shared,p,o)
     def post(self,shared,prep_res,exec_res): return exec_res
+    def run(self,shared): return self.resume(None,shared) if self.checkpointer else super().run(shared)
+    def resume(self,checkpoint,shared=None):
+        if self.checkpointer is None: raise ValueError("Flow has no checkpointer")
+        shared=self.checkpointer.begin(self,checkpoint,shared)
+        try: return super().run(shared)
+        finally: self.checkpointer.end(shared)
 
 class BatchFlow(Flow):
+    __slots__=()
     def _run(self,shared):
         pr=self.prep(shared) or []
-        for bp in pr: self._orch(shared,{**self.params,**bp})
+        for k,bp in enumerate(pr): self._orch(shared,{**self.params,**bp},k)
         return self.post(shared,pr,None)
 
+class Throttle:
+    def __init__(self,max_concurrency=None,rate_limit=None):
+        rate,burst=rate_limit if isinstance(rate_limit,tuple) else (rate_limit,max(1,rate_limit or 1))
+        self.max_concurrency,self.rate,self.burst,self.tokens,self.t=max_concurrency,rate,burst,burst,time.monotonic()
+        self.in_flight,self.queued,self._sem,self._loop=0,0,None,None
+    async def _take(self):
+        while True:
+            now=time.monotonic(); self.tokens=min(self.burst,self.tokens+(now-self.t)*self.rate); self.t=now
+            if self.tokens>=1: self.tokens-=1; return
+            await asyncio.sleep((1-self.tokens)/self.rate)
+    async def __aenter__(self):
+        if self.max_concurrency and self._loop is not asyncio.get_running_loop(): self._sem,self._loop=asyncio.Semaphore(self.max_concurrency),asyncio.get_running_loop()
+        self.queued+=1
+        try:
+            if self._sem: await self._sem.acquire()
+            try:
+                if self.rate: await self._take()
+            except BaseException:
+                if self._sem: self._sem.release()
+                raise
+        finally: self.queued-=1
+        self.in_flight+=1; return self
+    async def __aexit__(self,*exc):
+        self.in_flight-=1
+        if self._sem: self._sem.release()
+    async def call(self,fn,*args):
+        async with self: return await fn(*args)
+
+async def _gather(aws):
+    ts=[asyncio.ensure_future(a) for a in aws]
+    try: return await asyncio.gather(*ts)
+    except BaseException:
+        for t in ts: t.cancel()
+        await asyncio.gather(*ts,return_exceptions=True); raise
+
+def _branch(shared,key): b=getattr(shared,"branch",None); return b(key) if b else shared
+
+async def _bounded(aw,timeout,name):
+    try: return await asyncio.wait_for(aw,timeout)
+    except asyncio.TimeoutError: raise TimeoutError(f"{name} timed out after {timeout}s") from None
+
+async def _traced_async(node,t,shared,run=None):
+    t.on_node_start(node); tm,a,err,c={},None,None,time.perf_counter; s=c()
+    try:
+        p=await node.prep_async(shared); tm["prep"]=(s1:=c())-s
+        if run: a=await run(p); tm["exec"]=c()-s1; return a
+        e=await node._exec(p); tm["exec"]=(s2:=c())-s1; a=await node.post_async(shared,p,e); tm["post"]=c()-s2; return a
+    except BaseException as x: err=x; raise
+    finally: tm["total"]=c()-s; t.on_node_end(node,a,tm,err)
+
 class AsyncNode(Node):
+    __slots__=()
     async def prep_async(self,shared): pass
     async def exec_async(self,prep_res): pass
     async def exec_fallback_async(self,prep_res,exc): raise exc
+    async def _call_async(self,prep_res): return await (_bounded(self.exec_async(prep_res),self.timeout,type(self).__name__) if self.timeout else self.exec_async(prep_res))
     async def post_async(self,shared,prep_res,exec_res): pass
     async def _exec(self,prep_res): 
-        for i in range(self.max_retries):
-            try: return await self.exec_async(prep_res)
+        run=_run.get()
+        if run is None or run.node is not self: return await _hop_async(self,self._params,AsyncNode._exec,self,prep_res)
+        k=None
+        if self.cache is not None:
+            k=self.cache.key(self,prep_res); hit,v=self.cache.get(k)
+            if hit: return v
+        if self.coalesce is not None: return await self.coalesce.run(self,prep_res,self._attempts_async,prep_res,run,k)
+        return await self._attempts_async(prep_res,run,k)
+    async def _attempts_async(self,prep_res,run,k):
+        t0=time.monotonic()
+        for run.cur_retry in range(self.max_retries):
+            try: r=await (self.throttle.call(self._call_async,prep_res) if self.throttle else self._call_async(prep_res))
             except Exception as e:
-                if i==self.max_retries-1: return await self.exec_fallback_async(prep_res,e)
-                if self.wait>0: await asyncio.sleep(self.wait)
+                d,t=None if run.cur_retry==self.max_retries-1 else self._delay(e,run,t0),_tracer.get()
+                if d is None:
+                    if t: t.on_fallback(self,e)
+                    return await self.exec_fallback_async(prep_res,e)
+                if t: t.on_retry(self,run.cur_retry,e,d)
+                if d>0: await asyncio.sleep(d)
+                continue
+            if self.cache is not None: self.cache.set(k,r)
+            return r
     async def run_async(self,shared): 
         if self.successors: warnings.warn("Node won't run successors. Use AsyncFlow.")  
-        return await self._run_async(shared)
-    async def _run_async(self,shared): p=await self.prep_async(shared); e=await self._exec(p); return await self.post_async(shared,p,e)
+        tok=_run.set(_child(self,self._params))
+        try: return await self._run_async(shared)
+        finally: _run.reset(tok)
+    async def _run_async(self,shared):
+        t=_tracer.get()
+        if t: return await _traced_async(self,t,shared)
+        p=await self.prep_async(shared); e=await self._exec(p); return await self.post_async(shared,p,e)
     def _run(self,shared): raise RuntimeError("Use run_async.")
 
 class AsyncBatchNode(AsyncNode,BatchNode):
-    async def _exec(self,items): return [await super(AsyncBatchNode,self)._exec(i) for i in items]
+    __slots__=()
+    async def _exec(self,items):
+        if not _bound(self): return await _hop_async(self,self._params,AsyncBatchNode._exec,self,items)
+        return [await super(AsyncBatchNode,self)._exec(i) for i in items]
 
 class AsyncParallelBatchNode(AsyncNode,BatchNode):
-    async def _exec(self,items): return await asyncio.gather(*(super(AsyncParallelBatchNode,self)._exec(i) for i in items))
+    __slots__=()
+    def __init__(self,max_retries=1,wait=0,max_concurrency=None,rate_limit=None,**kwargs):
+        super().__init__(max_retries,wait,**kwargs); self.throttle=Throttle(max_concurrency,rate_limit) if max_concurrency or rate_limit else None
+    async def _exec(self,items):
+        if not _bound(self): return await _hop_async(self,self._params,AsyncParallelBatchNode._exec,self,items)
+        run=_run.get(); return await _gather(_within_async(run.fork(),super(AsyncParallelBatchNode,self)._exec,i) for i in items)
 
 class AsyncFlow(Flow,AsyncNode):
-    async def _orch_async(self,shared,params=None):
-        curr,p,last_action =copy.copy(self.start_node),(params or {**self.params}),None
-        while curr: curr.set_params(p); last_action=await curr._run_async(shared) if isinstance(curr,AsyncNode) else curr._run(shared); curr=copy.copy(self.get_next_node(curr,last_action))
-        return last_action
+    __slots__=()
+    def __init__(self,start=None,offload=False,timeout=None): super().__init__(start); self.offload,self.timeout=offload,timeout
+    async def _run_sync(self,node,shared):
+        if node.offload if node.offload is not None else self.offload: return await asyncio.get_running_loop().run_in_executor(thread_pool(),contextvars.copy_context().run,node._run,shared)
+        return node._run(shared)
+    async def _orch_async(self,shared,params=None,key=None): return await (_bounded(self._steps_async(shared,params,key),self.timeout,type(self).__name__) if self.timeout else self._steps_async(shared,params,key))
+    async def _steps_async(self,shared,params=None,key=None):
+        p,last_action,pl,t,ck,i=(params or {**self.params}),None,self._plan,_tracer.get(),_tracking(self),0
+        if ck: pl=pl or ck.plan(self); i,last_action,p=ck.start(self,key,p)
+        run=_child(self,p,self.timeout); tok,rid,dl=_run.set(run),run.run_id,run.deadline
+        try:
+            if pl:
+                while i>=0:
+                    n=pl.nodes[i]; _run.set(RunContext(n,p,rid,dl)); last_action=await n._run_async(shared) if pl.asyn[i] else await self._run_sync(n,shared); i=pl.step(i,last_action)
+                    if t: t.on_transition(self,n,last_action,pl.nodes[i] if i>=0 else None)
+                    if ck: ck.hop(self,shared,key,p,i,last_action)
+                return last_action
+            curr=self.start_node
+            while curr:
+                _run.set(RunContext(curr,p,rid,dl)); last_action=await curr._run_async(shared) if isinstance(curr,AsyncNode) else await self._run_sync(curr,shared); nxt=self.get_next_node(curr,last_action)
+                if t: t.on_transition(self,curr,last_action,nxt)
+                curr=nxt
+            return last_action
+        finally: _run.reset(tok)
     async def _run_async(self,shared): p=await self.prep_async(shared); o=await self._orch_async(shared); return await self.post_async(shared,p,o)
     async def post_async(self,shared,prep_res,exec_res): return exec_res
+    def stream(self,shared,buffer=1):
+        from .stream import FlowStream
+        return FlowStream(self,shared,buffer)
+    async def run_async(self,shared): return await self.resume_async(None,shared) if self.checkpointer else await super().run_async(shared)
+    async def resume_async(self,checkpoint,shared=None):
+        if self.checkpointer is None: raise ValueError("Flow has no checkpointer")
+        shared=self.checkpointer.begin(self,checkpoint,shared)
+        try: return await super().run_async(shared)
+        finally: self.checkpointer.end(shared)
 
 class AsyncBatchFlow(AsyncFlow,BatchFlow):
+    __slots__=()
     async def _run_async(self,shared):
         pr=await self.prep_async(shared) or []
-        for bp in pr: await self._orch_async(shared,{**self.params,**bp})
+        for k,bp in enumerate(pr): await self._orch_async(shared,{**self.params,**bp},k)
         return await self.post_async(shared,pr,None)
 
 class AsyncParallelBatchFlow(AsyncFlow,BatchFlow):
+    __slots__=()
+    def __init__(self,start=None,max_concurrency=None,rate_limit=None,offload=False,timeout=None,scheduler=None):
+        super().__init__(start,offload,timeout); self.throttle=Throttle(max_concurrency,rate_limit) if max_concurrency or rate_limit else None
+        if scheduler is not None: self.scheduler=scheduler
     async def _run_async(self,shared): 
-        pr=await self.prep_async(shared) or []
-        await asyncio.gather(*(self._orch_async(shared,{**self.params,**bp}) for bp in pr))
+        ov=self.overlay
+        if ov and self.checkpointer: raise ValueError("A checkpointer can't track branches that write to an overlay; use one or the other")
+        pr=await self.prep_async(shared) or []; bs=[ov(shared) if ov else _branch(shared,k) for k in range(len(pr))]
+        t,s=self.throttle,self.scheduler; go=lambda k,p: t.call(self._orch_async,bs[k],p,k) if t else self._orch_async(bs[k],p,k)
+        await _gather(s.schedule(p,go,k,p) if s else go(k,p) for k,p in enumerate({**self.params,**bp} for bp in pr))
+        if ov:
+            for b in bs: b.merge()
         return await self.post_async(shared,pr,None)
\ No newline at end of file
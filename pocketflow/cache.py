@@ -0,0 +1,108 @@
+import asyncio, hashlib, pickle, sqlite3, threading, time
+from collections import OrderedDict
+
+def _encode(o,out):
+    if o is None or isinstance(o,(bool,int,float,complex)): out.append(f"{type(o).__name__}:{o!r};".encode())
+    elif isinstance(o,str): b=o.encode(); out.append(b"s%d:"%len(b)); out.append(b)
+    elif isinstance(o,(bytes,bytearray)): out.append(b"b%d:"%len(o)); out.append(bytes(o))
+    elif isinstance(o,(list,tuple)):
+        out.append(b"l(" if isinstance(o,list) else b"t(")
+        for x in o: _encode(x,out)
+        out.append(b")")
+    elif isinstance(o,dict):
+        out.append(b"d(")
+        for k,v in sorted(((stable_hash(k),v) for k,v in o.items()),key=lambda kv:kv[0]): out.append(k.encode()); _encode(v,out)
+        out.append(b")")
+    elif isinstance(o,(set,frozenset)): out.append(b"S("); out.extend(sorted(stable_hash(x).encode() for x in o)); out.append(b")")
+    elif hasattr(o,"tobytes") and hasattr(o,"dtype"): out.append(f"a{o.dtype}{getattr(o,'shape',())}:".encode()); out.append(o.tobytes())
+    elif hasattr(o,"__dict__"): out.append(f"o{type(o).__module__}.{type(o).__qualname__}(".encode()); _encode(vars(o),out); out.append(b")")
+    else: out.append(f"r{type(o).__qualname__}:{o!r};".encode())
+
+def stable_hash(obj):
+    out=[]; _encode(obj,out); return hashlib.sha256(b"".join(out)).hexdigest()
+
+def _node_key(node,prep_res,params):
+    k=f"{type(node).__module__}.{type(node).__qualname__}:{stable_hash(prep_res)}"
+    return f"{k}:{stable_hash(node.params)}" if params and node.params else k
+
+class Cache:
+    def __init__(self,ttl=None,params=True): self.ttl,self.params,self.hits,self.misses,self._lock=ttl,params,0,0,threading.Lock()
+    def key(self,node,prep_res): return _node_key(node,prep_res,self.params)
+    def get(self,key):
+        found,value=self._get(key)
+        with self._lock:
+            if found: self.hits+=1
+            else: self.misses+=1
+        return found,value
+    def set(self,key,value): self._set(key,value,time.time()+self.ttl if self.ttl else None)
+    @property
+    def hit_rate(self): return self.hits/(self.hits+self.misses) if self.hits+self.misses else 0.0
+    def _get(self,key): raise NotImplementedError
+    def _set(self,key,value,expires): raise NotImplementedError
+
+class LRUCache(Cache):
+    def __init__(self,maxsize=1024,ttl=None,params=True): super().__init__(ttl,params); self.maxsize,self._data=maxsize,OrderedDict()
+    def _get(self,key):
+        with self._lock:
+            e=self._data.get(key)
+            if e is None: return False,None
+            if e[0] is not None and e[0]<time.time(): del self._data[key]; return False,None
+            self._data.move_to_end(key); return True,e[1]
+    def _set(self,key,value,expires):
+        with self._lock:
+            self._data[key]=(expires,value); self._data.move_to_end(key)
+            while self.maxsize and len(self._data)>self.maxsize: self._data.popitem(last=False)
+    def clear(self):
+        with self._lock: self._data.clear()
+    def __len__(self): return len(self._data)
+
+class SQLiteCache(Cache):
+    def __init__(self,path,ttl=None,table="pocketflow_cache",params=True):
+        super().__init__(ttl,params); self.table=table; self._db=sqlite3.connect(path,check_same_thread=False,isolation_level=None)
+        with self._lock: self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+    def _get(self,key):
+        with self._lock: row=self._db.execute(f"SELECT value,expires FROM {self.table} WHERE key=?",(key,)).fetchone()
+        if row is None: return False,None
+        if row[1] is not None and row[1]<time.time():
+            with self._lock: self._db.execute(f"DELETE FROM {self.table} WHERE key=?",(key,))
+            return False,None
+        return True,pickle.loads(row[0])
+    def _set(self,key,value,expires):
+        blob=pickle.dumps(value)
+        with self._lock: self._db.execute(f"INSERT OR REPLACE INTO {self.table} VALUES (?,?,?)",(key,blob,expires))
+    def clear(self):
+        with self._lock: self._db.execute(f"DELETE FROM {self.table}")
+    def __len__(self):
+        with self._lock: return self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+    def close(self): self._db.close()
+
+class SingleFlight:
+    def __init__(self,retain=0,params=True): self.retain,self.params,self.calls,self.executions,self.coalesced,self._inflight,self._done=retain,params,0,0,0,{},OrderedDict()
+    def key(self,node,prep_res): return _node_key(node,prep_res,self.params)
+    @property
+    def ratio(self): return self.coalesced/self.calls if self.calls else 0.0
+    @property
+    def in_flight(self): return len(self._inflight)
+    def _settle(self,k,e):
+        t=e[0]
+        if self._inflight.get(k) is e: del self._inflight[k]
+        if t.cancelled() or t.exception() is not None or not self.retain: return
+        now=time.monotonic(); self._done[k]=(now+self.retain,t.result()); self._done.move_to_end(k)
+        while self._done and next(iter(self._done.values()))[0]<=now: self._done.popitem(last=False)
+    async def run(self,node,prep_res,fn,*args):
+        k=(asyncio.get_running_loop(),self.key(node,prep_res)); self.calls+=1
+        d=self._done.get(k) if self.retain else None
+        if d is not None and d[0]>time.monotonic(): self.coalesced+=1; return d[1]
+        e=self._inflight.get(k)
+        if e is None:
+            e=self._inflight[k]=[asyncio.ensure_future(fn(*args)),0]; self.executions+=1; e[0].add_done_callback(lambda _: self._settle(k,e))
+        else: self.coalesced+=1
+        e[1]+=1
+        try: return await asyncio.shield(e[0])
+        except asyncio.CancelledError:
+            e[1]-=1
+            if not e[1] and not e[0].done():
+                e[0].cancel()
+                if self._inflight.get(k) is e: del self._inflight[k]
+            raise
+    def clear(self): self._done.clear()
@@ -0,0 +1,91 @@
+import os, pickle, sqlite3, tempfile, threading, time
+from . import _Plan
+
+class Checkpoint:
+    def __init__(self,graph,positions,done,shared,hops,saved_at=None):
+        self.graph,self.positions,self.done,self.shared,self.hops,self.saved_at=graph,positions,done,shared,hops,saved_at or time.time()
+    def __repr__(self): return f"Checkpoint(hops={self.hops}, done={len(self.done)}, in_progress={list(self.positions)})"
+
+class _Pickled(dict): pass
+
+def _graph(plan): return tuple(f"{type(n).__module__}.{type(n).__qualname__}" for n in plan.nodes)
+
+class Checkpointer:
+    def __init__(self,store,every=1,seconds=None,exclude=(),incremental=False):
+        self.store,self.every,self.seconds,self.exclude,self.incremental,self._lock=store,every,seconds,set(exclude),incremental,threading.RLock(); self._reset(None)
+    def _reset(self,graph): self.flow,self._plans,self.graph,self.positions,self.done,self.hops,self._since,self._t,self._blobs=None,{},graph,{},{},0,0,time.monotonic(),(None,None,_Pickled())
+    def begin(self,flow,checkpoint,shared):
+        self._reset(None); self.graph=_graph(self.plan(flow)); self.flow=flow; shared={} if shared is None else shared
+        if checkpoint is not None:
+            if tuple(checkpoint.graph)!=self.graph: raise ValueError("Checkpoint was taken from a different flow graph")
+            self.positions,self.done,self.hops=dict(checkpoint.positions),dict(checkpoint.done),checkpoint.hops
+            shared.update(self.restore(checkpoint))
+        return shared
+    def end(self,shared):
+        try: self.save(shared)
+        finally: self.flow=None
+    def plan(self,flow):
+        if flow._plan is not None: return flow._plan
+        with self._lock:
+            pl=self._plans.get(id(flow))
+            if pl is None:
+                if flow.start_node is None: raise ValueError("Flow has no start node")
+                pl=self._plans[id(flow)]=_Plan(flow.start_node)
+            return pl
+    def start(self,flow,key,params):
+        if key in self.done: return -1,self.done[key],params
+        pos=self.positions.get(key)
+        return (pos[0],pos[2],pos[1]) if pos else (0,None,params)
+    def hop(self,flow,shared,key,params,i,action):
+        with self._lock:
+            if i<0: self.done[key]=action; self.positions.pop(key,None)
+            else: self.positions[key]=(i,params,action)
+            self.hops+=1; self._since+=1
+            if (self.every and self._since>=self.every) or (self.seconds and time.monotonic()-self._t>=self.seconds): self.save(shared)
+    def snapshot(self,shared):
+        root=getattr(shared,"root",shared)
+        if not (self.incremental and hasattr(root,"changes")): return pickle.dumps({k:v for k,v in dict(root).items() if k not in self.exclude})
+        src,ver,blobs=self._blobs; ver=ver if src is root else None; now=root.version; changed,deleted=root.changes(ver)
+        if ver is None: blobs=_Pickled()
+        for k in deleted: blobs.pop(k,None)
+        for k,v in changed.items():
+            if k not in self.exclude: blobs[k]=pickle.dumps(v)
+        self._blobs=(root,now,blobs); return pickle.dumps(blobs)
+    def restore(self,checkpoint):
+        d=pickle.loads(checkpoint.shared)
+        return {k:pickle.loads(b) for k,b in d.items()} if isinstance(d,_Pickled) else d
+    def save(self,shared):
+        with self._lock:
+            if self.graph is None: return
+            self.store.save(Checkpoint(self.graph,dict(self.positions),dict(self.done),self.snapshot(shared),self.hops)); self._since,self._t=0,time.monotonic()
+
+class FileStore:
+    def __init__(self,path): self.path=os.fspath(path)
+    def save(self,checkpoint):
+        fd,tmp=tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),prefix=".ckpt-")
+        try:
+            with os.fdopen(fd,"wb") as f: pickle.dump(checkpoint,f)
+            os.replace(tmp,self.path)
+        except BaseException:
+            if os.path.exists(tmp): os.remove(tmp)
+            raise
+    def load(self):
+        try:
+            with open(self.path,"rb") as f: return pickle.load(f)
+        except FileNotFoundError: return None
+    def clear(self):
+        if os.path.exists(self.path): os.remove(self.path)
+
+class SQLiteStore:
+    def __init__(self,path,name="default",table="pocketflow_checkpoints"):
+        self.name,self.table,self._lock=name,table,threading.Lock(); self._db=sqlite3.connect(path,check_same_thread=False,isolation_level=None)
+        with self._lock: self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} (name TEXT PRIMARY KEY, data BLOB, saved_at REAL)")
+    def save(self,checkpoint):
+        blob=pickle.dumps(checkpoint)
+        with self._lock: self._db.execute(f"INSERT OR REPLACE INTO {self.table} VALUES (?,?,?)",(self.name,blob,checkpoint.saved_at))
+    def load(self):
+        with self._lock: row=self._db.execute(f"SELECT data FROM {self.table} WHERE name=?",(self.name,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+    def clear(self):
+        with self._lock: self._db.execute(f"DELETE FROM {self.table} WHERE name=?",(self.name,))
+    def close(self): self._db.close()
@@ -0,0 +1,51 @@
+import asyncio, contextvars
+from concurrent import futures
+from . import Node, AsyncNode, thread_pool, _gather, _tracer, _traced, _traced_async, _hop, _hop_async
+
+class _Cancelled:
+    def __repr__(self): return "CANCELLED"
+CANCELLED=_Cancelled()
+
+class FanOut(Node):
+    def __init__(self,*branches,first=None,max_workers=None):
+        super().__init__()
+        if any(isinstance(b,AsyncNode) for b in branches): raise TypeError("FanOut branches must be sync nodes or flows; use AsyncFanOut")
+        self.branches,self.first,self.max_workers=list(branches),first,max_workers
+    def _fan(self,shared):
+        n=len(self.branches); res=[CANCELLED]*n
+        if not n: return res
+        pool=futures.ThreadPoolExecutor(self.max_workers or n,thread_name_prefix="pocketflow-fanout")
+        p=self.params; fs={pool.submit(contextvars.copy_context().run,_hop,b,p,b._run,shared):i for i,b in enumerate(self.branches)}
+        try:
+            pending,done=set(fs),0
+            while pending and done<(self.first or n):
+                finished,pending=futures.wait(pending,return_when=futures.FIRST_COMPLETED)
+                for f in finished: res[fs[f]]=f.result(); done+=1
+            return res
+        finally:
+            for f in fs: f.cancel()
+            pool.shutdown(wait=False)
+    def _run(self,shared):
+        run,t=lambda p: self.post(shared,p,self._fan(shared)),_tracer.get()
+        return _traced(self,t,shared,run) if t else run(self.prep(shared))
+
+class AsyncFanOut(AsyncNode):
+    def __init__(self,*branches,first=None): super().__init__(); self.branches,self.first=list(branches),first
+    async def _one(self,b,shared):
+        if isinstance(b,AsyncNode): return await _hop_async(b,self.params,b._run_async,shared)
+        return await asyncio.get_running_loop().run_in_executor(thread_pool(),contextvars.copy_context().run,_hop,b,self.params,b._run,shared)
+    async def _fan(self,shared):
+        if not self.first: return await _gather(self._one(b,shared) for b in self.branches)
+        ts=[asyncio.ensure_future(self._one(b,shared)) for b in self.branches]; res,done=[CANCELLED]*len(ts),0
+        try:
+            pending=set(ts)
+            while pending and done<self.first:
+                finished,pending=await asyncio.wait(pending,return_when=asyncio.FIRST_COMPLETED)
+                for t in finished: res[ts.index(t)]=t.result(); done+=1
+            return res
+        finally:
+            for t in ts: t.cancel()
+            await asyncio.gather(*ts,return_exceptions=True)
+    async def _run_async(self,shared):
+        async def run(p): return await self.post_async(shared,p,await self._fan(shared))
+        t=_tracer.get(); return await (_traced_async(self,t,shared,run) if t else run(await self.prep_async(shared)))
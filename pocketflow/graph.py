@@ -0,0 +1,123 @@
+import ast, inspect, textwrap, warnings
+from . import AsyncNode, AsyncFlow, Flow, BatchFlow
+
+ERRORS=("missing_target","cycle_without_exit","async_in_sync")
+
+class Issue:
+    __slots__=("kind","path","message")
+    def __init__(self,kind,path,message): self.kind,self.path,self.message=kind,path,message
+    @property
+    def error(self): return self.kind in ERRORS
+    def __str__(self): return f"{self.path}: {self.message}"
+    def __repr__(self): return f"Issue({self.kind!r}, {str(self)!r})"
+
+class FlowValidationError(ValueError):
+    def __init__(self,issues): super().__init__(f"{len(issues)} problem(s) in flow:\n"+"\n".join(f"  {i}" for i in issues)); self.issues=issues
+
+def _values(e):
+    if e is None or isinstance(e,ast.Constant) and (e.value is None or isinstance(e.value,str)): return {getattr(e,"value",None) or "default"}
+    if isinstance(e,ast.IfExp):
+        a,b=_values(e.body),_values(e.orelse); return a|b if a is not None and b is not None else None
+    return None
+
+def _returns(tree):
+    for c in ast.iter_child_nodes(tree):
+        if isinstance(c,(ast.FunctionDef,ast.AsyncFunctionDef,ast.Lambda,ast.ClassDef)): continue
+        if isinstance(c,ast.Return): yield c
+        yield from _returns(c)
+
+def _either(*xs): return True if True in xs else None if None in xs else False
+
+def _open(body):
+    for s in body:
+        if isinstance(s,(ast.Return,ast.Raise)): return False
+        if isinstance(s,ast.If): o=_either(_open(s.body),_open(s.orelse))
+        elif isinstance(s,(ast.With,ast.AsyncWith)): o=_open(s.body)
+        elif isinstance(s,(ast.Try,getattr(ast,"TryStar",ast.Try))): o=False if _open(s.finalbody) is False else _either(_open(s.body+s.orelse),*(_open(h.body) for h in s.handlers))
+        elif isinstance(s,ast.While) and isinstance(s.test,ast.Constant) and s.test.value or isinstance(s,ast.Match): o=None
+        else: continue
+        if o is not True: return o
+    return True
+
+def returned(fn):
+    try: f=ast.parse(textwrap.dedent(inspect.getsource(fn))).body[0]
+    except (OSError,TypeError,SyntaxError,IndexError): return None
+    if not isinstance(f,(ast.FunctionDef,ast.AsyncFunctionDef)): return None
+    out=set()
+    for r in _returns(f):
+        v=_values(r.value)
+        if v is None: return None
+        out|=v
+    o=_open(f.body)
+    if o is None: return None
+    if o: out.add("default")
+    return out
+
+class Graph:
+    def __init__(self,flow,path=None):
+        if flow._plan is None: flow.compile()
+        pl,self.flow,self.path=flow._plan,flow,path or type(flow).__name__
+        self.plan,self.nodes=pl,pl.nodes; self.index={n:i for i,n in enumerate(self.nodes)}
+        self.edges={n:dict(n.successors) for n in self.nodes}; self.preds={n:[] for n in self.nodes}
+        for n,es in self.edges.items():
+            for a,t in es.items(): self.preds[t].append((n,a))
+        self.flows={n:Graph(n,f"{self.path} > {self.name(n)}") for n in self.nodes if isinstance(n,Flow)}
+        self.actions={n:self._actions(n) for n in self.nodes}; self.issues=[]; self._check()
+    def name(self,node): return f"{type(node).__name__}#{self.index[node]}"
+    def _actions(self,n):
+        a=getattr(n,"actions",None)
+        if a is not None: return {x or "default" for x in a}
+        if isinstance(n,Flow):
+            if type(n).post_async is AsyncFlow.post_async if isinstance(n,AsyncNode) else type(n).post is Flow.post: return {"default"} if isinstance(n,BatchFlow) else self.flows[n].ends()
+        return returned(type(n).post_async if isinstance(n,AsyncNode) else type(n).post)
+    def ends(self):
+        out=set()
+        for n in self.nodes:
+            a=self.actions[n]
+            if a is None: return None
+            out|=a-self.edges[n].keys()
+        return out
+    def live(self,n): a=self.actions[n]; return [t for k,t in self.edges[n].items() if a is None or k in a]
+    def reach(self,n):
+        seen,todo=set(),[n]
+        while todo:
+            for t in self.live(todo.pop()):
+                if t not in seen: seen.add(t); todo.append(t)
+        return seen
+    def _issue(self,kind,node,message): self.issues.append(Issue(kind,f"{self.path} > {self.name(node)}",message))
+    def exits(self,n):
+        a=self.actions[n]; return None if a is None else a-self.edges[n].keys()-{x or "default" for x in getattr(n,"terminal",())}
+    def _check(self):
+        asyn,loops=isinstance(self.flow,AsyncNode),set()
+        live={self.nodes[0]}|self.reach(self.nodes[0]); reach,done={n:self.reach(n) for n in live},set()
+        for n in self.nodes:
+            if n in done or n not in reach.get(n,()): continue
+            scc={m for m in reach[n] if n in reach[m]}; done|=scc; loops|=scc
+            if all(t in scc for m in scc for t in self.live(m)) and not any(self.actions[m] is None or self.actions[m]-self.edges[m].keys() for m in scc):
+                self._issue("cycle_without_exit",min(scc,key=self.index.get),f"loop through {sorted(map(self.name,scc))} has no way out")
+        for n in self.nodes:
+            es,a=self.edges[n],self.actions[n]
+            if isinstance(n,AsyncNode) and not asyn: self._issue("async_in_sync",n,f"async node in sync {type(self.flow).__name__}; it can only run under an AsyncFlow")
+            if asyn and not isinstance(n,AsyncNode) and not (n.offload if n.offload is not None else self.flow.offload): self._issue("sync_in_async",n,"sync node blocks the event loop; set offload=True or make it async")
+            if a is None or not es: continue
+            for k in sorted(self.exits(n)):
+                if n in loops: self._issue("ends_flow",n,f"returns '{k}', which ends the flow (wired: {list(es)}); list it in `terminal` if that's intended")
+                else: self._issue("missing_target",n,f"returns '{k}' but has no successor for it (wired: {list(es)})")
+            for k in es.keys()-a: self._issue("dead_edge",n,f"edge '{k}' is never taken; post only returns {sorted(a)}")
+        for n in self.nodes:
+            if n not in live: self._issue("unreachable",n,"only reachable through edges that are never taken")
+    def walk(self):
+        yield self
+        for g in self.flows.values(): yield from g.walk()
+    @property
+    def errors(self): return [i for g in self.walk() for i in g.issues if i.error]
+    @property
+    def warnings(self): return [i for g in self.walk() for i in g.issues if not i.error]
+
+def validate(flow,strict=True):
+    g=Graph(flow.compile())
+    for i in g.warnings: warnings.warn(str(i))
+    if strict and g.errors: raise FlowValidationError(g.errors)
+    for s in g.walk():
+        if not any(i.error for i in s.issues): s.plan.loose=tuple(bool(s.edges[n]) and s.exits(n)!=set() for n in s.nodes)
+    return g
@@ -0,0 +1,72 @@
+import asyncio, time
+from . import AsyncNode, BatchNode, _bounded, _bound, _gather, _hop_async, _run, _tracer, _within_async
+from .cache import stable_hash
+
+class _Item:
+    __slots__=("value","future","run","t0","tracer","ck")
+    def __init__(self,value,future,run,t0,tracer,ck): self.value,self.future,self.run,self.t0,self.tracer,self.ck=value,future,run,t0,tracer,ck
+
+class AsyncMicroBatchNode(AsyncNode,BatchNode):
+    def __init__(self,max_retries=1,wait=0,max_batch_size=16,max_wait_ms=5,**kwargs):
+        super().__init__(max_retries,wait,**kwargs); self.max_batch_size,self.max_wait_ms=max_batch_size,max_wait_ms
+        self.batch_calls,self.batched_items,self._pending,self._tasks=0,0,{},set()
+    async def exec_batch_async(self,items): return await asyncio.gather(*(self.exec_async(i) for i in items),return_exceptions=True)
+    @property
+    def mean_batch_size(self): return self.batched_items/self.batch_calls if self.batch_calls else 0.0
+    async def _exec(self,items):
+        if not _bound(self): return await _hop_async(self,self._params,AsyncMicroBatchNode._exec,self,items)
+        run,loop,t,t0,fs=_run.get(),asyncio.get_running_loop(),_tracer.get(),time.monotonic(),[]
+        key=(loop,stable_hash(run.params) if run.params else None)
+        for i in items or ():
+            f,ck=loop.create_future(),None; fs.append(f)
+            if self.cache is not None:
+                ck=self.cache.key(self,i); hit,v=self.cache.get(ck)
+                if hit: f.set_result(v); continue
+            self._put(key,_Item(i,f,run.fork(),t0,t,ck))
+        return await _gather(fs)
+    def _spawn(self,coro): t=asyncio.ensure_future(coro); self._tasks.add(t); t.add_done_callback(self._tasks.discard)
+    def _put(self,key,e):
+        q=self._pending.get(key)
+        if q is None: q=self._pending[key]=[[],None]
+        q[0].append(e)
+        if len(q[0])>=self.max_batch_size: self._flush(key)
+        elif q[1] is None: q[1]=key[0].call_later(self.max_wait_ms/1000,self._flush,key)
+    def _flush(self,key):
+        q=self._pending.pop(key,None)
+        if q is None: return
+        if q[1]: q[1].cancel()
+        batch=[e for e in q[0] if not e.future.done()]
+        if batch: self._spawn(self._call(key,batch))
+    async def _call_batch(self,items): return await (_bounded(self.exec_batch_async(items),self.timeout,type(self).__name__) if self.timeout else self.exec_batch_async(items))
+    async def _send(self,items): return await (self.throttle.call(self._call_batch,items) if self.throttle else self._call_batch(items))
+    async def _call(self,key,batch):
+        items,run=[e.value for e in batch],batch[0].run.fork(); run.cur_retry=max(e.run.cur_retry for e in batch)
+        self.batch_calls+=1; self.batched_items+=len(batch)
+        try:
+            rs=list(await _within_async(run,self._send,items))
+            if len(rs)!=len(items): raise ValueError(f"{type(self).__name__}.exec_batch_async returned {len(rs)} results for {len(items)} items")
+        except Exception as x: rs=[x]*len(batch)
+        except BaseException:
+            for e in batch: e.future.cancel()
+            raise
+        for e,r in zip(batch,rs):
+            if e.future.done(): continue
+            if isinstance(r,Exception): self._failed(key,e,r); continue
+            if e.ck is not None: self.cache.set(e.ck,r)
+            e.future.set_result(r)
+    def _failed(self,key,e,exc):
+        run=e.run; d=None if run.cur_retry>=self.max_retries-1 else self._delay(exc,run,e.t0)
+        if d is None:
+            if e.tracer: e.tracer.on_fallback(self,exc)
+            return self._spawn(self._fallback(e,exc))
+        if e.tracer: e.tracer.on_retry(self,run.cur_retry,exc,d)
+        run.cur_retry+=1
+        if d>0: key[0].call_later(d,self._put,key,e)
+        else: self._put(key,e)
+    async def _fallback(self,e,exc):
+        try: r=await _within_async(e.run,self.exec_fallback_async,e.value,exc)
+        except asyncio.CancelledError: e.future.cancel(); raise
+        except Exception as x:
+            if not e.future.done(): e.future.set_exception(x)
+            return
+        if not e.future.done(): e.future.set_result(r)
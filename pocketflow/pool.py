@@ -0,0 +1,81 @@
+import math, copy, functools, os, pickle, contextvars
+from concurrent import futures
+from concurrent.futures import ProcessPoolExecutor
+from . import Node, BatchNode, BatchFlow, RunContext, _branch, _within
+from .store import MergeConflict
+
+def _exec_chunk(node,run,items): return _within(RunContext(node,node.params,*run),lambda: [Node._exec(node,i) for i in items])
+
+class ProcessPoolBatchNode(BatchNode):
+    def __init__(self,max_retries=1,wait=0,max_workers=None,chunksize=None,executor=None,mp_context=None,**kwargs):
+        super().__init__(max_retries,wait,**kwargs); self.max_workers,self.chunksize,self.executor,self.mp_context=max_workers,chunksize,executor,mp_context
+    def _dispatch(self,pool,items,workers):
+        node=copy.copy(self); node.successors,node.executor,node.mp_context,node.cache,node.params={},None,None,None,self.params; cs=self.chunksize or max(1,math.ceil(len(items)/(workers*4))); c=self.ctx
+        return [r for rs in pool.map(functools.partial(_exec_chunk,node,(c.run_id,c.deadline)),(items[i:i+cs] for i in range(0,len(items),cs))) for r in rs]
+    def _exec(self,items):
+        items=list(items or [])
+        if not items: return []
+        if self.executor: return self._dispatch(self.executor,items,getattr(self.executor,"_max_workers",os.cpu_count() or 1))
+        with ProcessPoolExecutor(self.max_workers,mp_context=self.mp_context) as pool: return self._dispatch(pool,items,pool._max_workers)
+
+class ThreadPoolBatchFlow(BatchFlow):
+    overlay=None
+    def __init__(self,start=None,max_workers=None,ordered=True): super().__init__(start); self.max_workers,self.ordered=max_workers,ordered
+    def post_item(self,shared,params,result): pass
+    def _executor(self): return futures.ThreadPoolExecutor(self.max_workers,thread_name_prefix="pocketflow-batch")
+    def _dispatcher(self,pool,shared): return (lambda branch,params,key: pool.submit(contextvars.copy_context().run,self._orch,branch,params,key)),(lambda f: f.result())
+    def _run(self,shared):
+        ov=self.overlay
+        if ov and self.checkpointer: raise ValueError("A checkpointer can't track branches that write to an overlay; use one or the other")
+        pr=self.prep(shared) or []; ps=[{**self.params,**bp} for bp in pr]; res=[None]*len(ps)
+        bs=[ov(shared) if ov else _branch(shared,k) for k in range(len(ps))]
+        with self._executor() as pool:
+            submit,result=self._dispatcher(pool,shared); fs={submit(bs[k],p,k):k for k,p in enumerate(ps)}
+            try:
+                for f in (fs if self.ordered else futures.as_completed(fs)):
+                    k=fs[f]; res[k]=result(f)
+                    if ov: bs[k].merge()
+                    self.post_item(shared,ps[k],res[k])
+            except BaseException:
+                for f in fs: f.cancel()
+                raise
+        return self.post(shared,pr,res)
+
+def _diff(before,after,path=()):
+    changed,deleted=[],[path+(k,) for k in before if k not in after]
+    for k,v in after.items():
+        if isinstance(v,dict) and v and isinstance(before.get(k,{}),dict): c,d=_diff(before.get(k,{}),v,path+(k,)); changed+=c; deleted+=d
+        elif k not in before or pickle.dumps(before[k])!=pickle.dumps(v): changed.append((path+(k,),v))
+    return changed,deleted
+
+def _run_branch(flow,shared,params,key=None,run=(None,None)):
+    flow,before,shared=pickle.loads(flow),pickle.loads(shared),pickle.loads(shared)
+    action=_within(RunContext(flow,params,*run),flow._orch,_branch(shared,key),params)
+    return (action,*_diff(before,shared))
+
+def _merge(shared,changed,deleted,seen,prefixes):
+    changed=[(p,v) for p,v in changed if not (v=={} and isinstance(v,dict) and p in prefixes)]
+    hit=lambda p,dele: p in prefixes or any(seen.get(p[:i]) not in (None,"d" if dele else None) for i in range(1,len(p)+1))
+    bad={p for p,_ in changed if hit(p,False)}|{p for p in deleted if hit(p,True)}
+    if bad: raise MergeConflict(bad)
+    for p,v in changed:
+        d=shared
+        for k in p[:-1]: d=d.setdefault(k,{})
+        d[p[-1]]=v
+    for p in deleted:
+        d=shared
+        for k in p[:-1]: d=d.get(k,{})
+        d.pop(p[-1],None)
+    for p,v in changed:
+        prefixes.update(p[:i] for i in range(1,len(p)))
+        if v=={} and isinstance(v,dict): prefixes.add(p)
+        else: seen[p]="w"
+    for p in deleted: seen.setdefault(p,"d")
+
+class ProcessPoolBatchFlow(ThreadPoolBatchFlow):
+    def __init__(self,start=None,max_workers=None,ordered=True,mp_context=None): super().__init__(start,max_workers,ordered); self.mp_context=mp_context
+    def _executor(self): return ProcessPoolExecutor(self.max_workers,mp_context=self.mp_context)
+    def _dispatcher(self,pool,shared):
+        flow=copy.copy(self); flow.successors,flow.checkpointer,flow.mp_context,flow.overlay={},None,None,None; fb,sb=pickle.dumps(flow),pickle.dumps(shared); seen,prefixes={},set()
+        def result(f): action,changed,deleted=f.result(); _merge(shared,changed,deleted,seen,prefixes); return action
+        c=self.ctx; return (lambda branch,params,key: pool.submit(_run_branch,fb,sb,params,key,(c.run_id,c.deadline))),result
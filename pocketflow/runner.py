@@ -0,0 +1,60 @@
+import asyncio, collections, contextvars, time, uuid
+from . import AsyncNode, Throttle, RunContext, thread_pool, _run
+
+class FlowRun:
+    def __init__(self,run_id,tenant,shared,priority=0,deadline=None):
+        self.id,self.tenant,self.shared,self.priority,self.deadline,self.status,self.result,self.error,self.task=run_id,tenant,shared,priority,deadline,"queued",None,None,None
+        self.submitted,self.started,self.finished=time.time(),None,None
+    def __repr__(self): return f"FlowRun(id={self.id!r}, tenant={self.tenant!r}, status={self.status!r})"
+    def done(self): return self.status in ("done","failed","cancelled")
+    async def wait(self):
+        await asyncio.shield(self.task)
+        if self.error is not None: raise self.error
+        return self.result
+
+class FlowRunner:
+    def __init__(self,flow,max_concurrency=None,per_tenant=None,tenant_limits=None,keep=1000,scheduler=None):
+        if flow._plan is None and flow.start_node is not None: flow.compile()
+        self.flow,self.per_tenant,self.tenant_limits,self.keep,self.scheduler=flow,per_tenant,dict(tenant_limits or {}),keep,scheduler
+        self.throttle,self.runs,self.counts,self._tenants,self._load,self._live,self._finished=Throttle(max_concurrency),{},collections.Counter(),{},collections.Counter(),set(),collections.deque()
+    def _tenant(self,tenant):
+        t=self._tenants.get(tenant)
+        if t is None: t=self._tenants[tenant]=Throttle(self.tenant_limits.get(tenant,self.per_tenant))
+        return t
+    def submit(self,shared=None,tenant=None,run_id=None,priority=0,deadline=None):
+        r=FlowRun(run_id or uuid.uuid4().hex,tenant,{} if shared is None else shared,priority,deadline)
+        if r.id in self.runs: raise ValueError(f"Run {r.id!r} already exists")
+        self.runs[r.id]=r; self._live.add(r); self._load[tenant]+=1; self.counts["submitted"]+=1
+        r.task=asyncio.ensure_future(self._drive(r)); r.task.add_done_callback(lambda _: self._settle(r)); return r
+    async def run(self,shared=None,tenant=None,priority=0,deadline=None): return await self.submit(shared,tenant,None,priority,deadline).wait()
+    async def _call(self,shared):
+        if isinstance(self.flow,AsyncNode): return await self.flow.run_async(shared)
+        return await asyncio.get_running_loop().run_in_executor(thread_pool(),contextvars.copy_context().run,self.flow.run,shared)
+    async def _start(self,r): r.status,r.started="running",time.time(); return await self._call(r.shared)
+    async def _drive(self,r):
+        _run.set(RunContext(None,{},r.id))
+        try:
+            async with self._tenant(r.tenant):
+                r.result=await (self.scheduler.submit(self._start,r,priority=r.priority,deadline=r.deadline) if self.scheduler else self.throttle.call(self._start,r))
+            r.status="done"
+        except Exception as e: r.status,r.error="failed",e
+    def _settle(self,r):
+        if r.task.cancelled(): r.status="cancelled"
+        r.finished=time.time(); self.counts[r.status]+=1; self._live.discard(r); self._finished.append(r.id)
+        self._load[r.tenant]-=1
+        if not self._load[r.tenant]: del self._load[r.tenant]; self._tenants.pop(r.tenant,None)
+        while len(self._finished)>self.keep: self.runs.pop(self._finished.popleft(),None)
+    def get(self,run_id): return self.runs.get(run_id)
+    def status(self,run_id): r=self.runs.get(run_id); return r.status if r else None
+    def cancel(self,run_id):
+        r=self.runs.get(run_id)
+        if r is None or r.done(): return False
+        r.task.cancel(); return True
+    def metrics(self):
+        tenants={}
+        for r in list(self._live): tenants.setdefault(r.tenant,{"queued":0,"active":0})["active" if r.status=="running" else "queued"]+=1
+        return {"queued":sum(t["queued"] for t in tenants.values()),"active":sum(t["active"] for t in tenants.values()),"tenants":tenants,**{k:self.counts[k] for k in ("submitted","done","failed","cancelled")}}
+    async def join(self): await asyncio.gather(*(r.task for r in list(self._live)),return_exceptions=True)
+    async def shutdown(self):
+        for r in list(self._live): r.task.cancel()
+        await self.join()
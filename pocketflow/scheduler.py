@@ -0,0 +1,58 @@
+import asyncio, collections, contextvars, heapq, itertools, math, time
+
+class _Job:
+    __slots__=("priority","due","t0","seq","fn","args","future","ctx","started")
+    def __init__(self,priority,due,t0,seq,fn,args,future,ctx): self.priority,self.due,self.t0,self.seq,self.fn,self.args,self.future,self.ctx,self.started=priority,due,t0,seq,fn,args,future,ctx,None
+
+def _pct(xs,q): s=sorted(xs); return s[min(len(s)-1,int(q*len(s)))] if s else None
+
+class PriorityScheduler:
+    def __init__(self,max_concurrency=8,aging=30,priority_key="priority",deadline_key="deadline",window=1000):
+        self.max_concurrency,self.aging,self.priority_key,self.deadline_key,self.window=max_concurrency,aging,priority_key,deadline_key,window
+        self.running,self._queues,self._seq,self._tasks,self._stats,self._kicked=0,{},itertools.count(),set(),{},False
+    @property
+    def queued(self): return sum(len(q) for q in self._queues.values())
+    def submit(self,fn,*args,priority=0,deadline=None):
+        loop,now=asyncio.get_running_loop(),time.monotonic()
+        j=_Job(priority,math.inf if deadline is None else now+deadline,now,next(self._seq),fn,args,loop.create_future(),contextvars.copy_context())
+        heapq.heappush(self._queues.setdefault(priority,[]),(j.due,j.seq,j))
+        if not self._kicked: self._kicked=True; loop.call_soon(self._dispatch)
+        return j.future
+    def schedule(self,params,fn,*args): return self.submit(fn,*args,priority=params.get(self.priority_key,0),deadline=params.get(self.deadline_key))
+    def _pick(self,now):
+        best=None
+        for p in list(self._queues):
+            q=self._queues[p]
+            while q and q[0][2].future.done(): heapq.heappop(q)
+            if not q: del self._queues[p]; continue
+            j=q[0][2]; k=(p-(now-j.t0)/self.aging if self.aging else p,j.due,j.seq)
+            if best is None or k<best[0]: best=(k,q)
+        return heapq.heappop(best[1])[2] if best else None
+    def _dispatch(self):
+        self._kicked=False
+        while self.running<self.max_concurrency:
+            j=self._pick(time.monotonic())
+            if j is None: return
+            self.running+=1; j.started=time.monotonic(); t=j.ctx.run(j.future.get_loop().create_task,self._run(j))
+            self._tasks.add(t); t.add_done_callback(self._tasks.discard); j.future.add_done_callback(lambda f,t=t: t.cancel() if f.cancelled() else None)
+    async def _run(self,j):
+        try: r=await j.fn(*j.args)
+        except asyncio.CancelledError: j.future.cancel(); raise
+        except BaseException as e:
+            if not j.future.done(): j.future.set_exception(e)
+        else:
+            if not j.future.done(): j.future.set_result(r)
+        finally:
+            self.running-=1
+            if not j.future.cancelled(): self._record(j)
+            self._dispatch()
+    def _record(self,j):
+        now,s=time.monotonic(),self._stats.get(j.priority)
+        if s is None: s=self._stats[j.priority]={"done":0,"missed":0,"wait":collections.deque(maxlen=self.window),"latency":collections.deque(maxlen=self.window)}
+        s["done"]+=1; s["missed"]+=now>j.due; s["wait"].append(j.started-j.t0); s["latency"].append(now-j.t0)
+    def stats(self):
+        out={}
+        for p in sorted(set(self._stats)|set(self._queues)):
+            s=self._stats.get(p) or {"done":0,"missed":0,"wait":(),"latency":()}
+            out[p]={"queued":len(self._queues.get(p,())),"done":s["done"],"missed":s["missed"],**{f"{k}_p{q}":_pct(s[k],q/100) for k in ("wait","latency") for q in (50,95)}}
+        return out
@@ -0,0 +1,163 @@
+import asyncio, pickle, threading, weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from . import _run
+
+_MISSING=object()
+
+class KeyLock:
+    def __init__(self): self._lock,self._alocks,self.version=threading.Lock(),weakref.WeakKeyDictionary(),0
+    def locked(self): return self._lock.locked() or any(l.locked() for l in list(self._alocks.values()))
+    def __enter__(self): self._lock.acquire(); return self
+    def __exit__(self,*exc): self._lock.release()
+    def _alock(self):
+        loop=asyncio.get_running_loop(); l=self._alocks.get(loop)
+        if l is None:
+            with self._lock: l=self._alocks.setdefault(loop,asyncio.Lock())
+        return l
+    async def __aenter__(self): await self._alock().acquire(); return self
+    async def __aexit__(self,*exc): self._alock().release()
+
+class SharedStore(MutableMapping):
+    def __init__(self,data=None,local=()): self._data,self.local,self._locks,self._guard=dict(data or {}),frozenset(local),{},threading.Lock()
+    def __getitem__(self,key): return self._data[key]
+    def __setitem__(self,key,value): self._data[key]=value
+    def __delitem__(self,key): del self._data[key]
+    def __iter__(self): return iter(list(self._data))
+    def __len__(self): return len(self._data)
+    def __repr__(self): return f"{type(self).__name__}({self._data!r})"
+    def __reduce__(self): return type(self),(dict(self._data),self.local)
+    @property
+    def root(self): return self
+    def lock(self,key):
+        with self._guard:
+            l=self._locks.get(key)
+            if l is None: l=self._locks[key]=KeyLock()
+            return l
+    def apply(self,key,fn,default=None):
+        with self.lock(key) as l: v=fn(self.get(key,default)); self[key]=v; l.version+=1; return v
+    async def apply_async(self,key,fn,default=None):
+        l=self.lock(key)
+        async with l:
+            while True:
+                with l: cur,ver=self.get(key,_MISSING),l.version
+                v=fn(default if cur is _MISSING else cur)
+                if asyncio.iscoroutine(v): v=await v
+                with l:
+                    if l.version==ver and self.get(key,_MISSING) is cur: self[key]=v; l.version+=1; return v
+    def incr(self,key,n=1): return self.apply(key,lambda v:v+n,0)
+    def append(self,key,item):
+        with self.lock(key) as l:
+            v=self.get(key,_MISSING)
+            if v is _MISSING: v=self[key]=[]
+            v.append(item); l.version+=1; return v
+    def setdefault(self,key,default=None):
+        with self.lock(key) as l:
+            v=self.get(key,_MISSING)
+            if v is _MISSING: v=self[key]=default; l.version+=1
+            return v
+    def branch(self,key=None): return _Branch(self,key)
+
+class _Branch(SharedStore):
+    def __init__(self,parent,key): super().__init__(None,parent.local); self.parent,self.key=parent,key
+    def _mine(self,key): return key in self.local
+    def __getitem__(self,key):
+        if self._mine(key) and key in self._data: return self._data[key]
+        return self.parent[key]
+    def __setitem__(self,key,value):
+        if self._mine(key): self._data[key]=value
+        else: self.parent[key]=value
+    def __delitem__(self,key):
+        if self._mine(key) and key in self._data: del self._data[key]
+        else: del self.parent[key]
+    def __iter__(self): return iter(list(dict.fromkeys([*self.parent,*self._data])))
+    def __len__(self): return len(set(self.parent)|set(self._data))
+    def __repr__(self): return f"{type(self).__name__}(key={self.key!r}, local={self._data!r})"
+    def __reduce__(self): return _Branch,(self.parent,self.key),{"_data":self._data}
+    @property
+    def root(self): return self.parent.root
+    def lock(self,key): return super().lock(key) if self._mine(key) else self.parent.lock(key)
+
+class Access:
+    __slots__=("node","run_id","start","reads","writes","deletes")
+    def __init__(self,node,run_id,start): self.node,self.run_id,self.start,self.reads,self.writes,self.deletes=node,run_id,start,set(),set(),set()
+    def __repr__(self): return f"Access(node={type(self.node).__name__ if self.node is not None else None}, reads={sorted(map(repr,self.reads))}, writes={sorted(map(repr,self.writes))}, deletes={sorted(map(repr,self.deletes))})"
+
+class TrackedStore(SharedStore):
+    def __init__(self,data=None,local=(),keep=10000):
+        super().__init__(data,local); self.version,self.keep,self._vers,self._acc,self._track=0,keep,dict.fromkeys(self._data,0),OrderedDict(),threading.Lock()
+    def _access(self):
+        c=_run.get(); a=self._acc.get(c)
+        if a is None:
+            a=self._acc[c]=Access(c.node if c else None,c.run_id if c else None,self.version)
+            while len(self._acc)>self.keep: self._acc.popitem(last=False)
+        return a
+    def _wrote(self,key,deleted=False):
+        with self._track:
+            a=self._access(); self.version+=1; self._vers[key]=self.version
+            if deleted: a.deletes.add(key); a.writes.discard(key)
+            else: a.writes.add(key); a.deletes.discard(key)
+    def __getitem__(self,key):
+        v=self._data[key]
+        with self._track: self._access().reads.add(key)
+        return v
+    def __setitem__(self,key,value): self._data[key]=value; self._wrote(key)
+    def __delitem__(self,key): del self._data[key]; self._wrote(key,True)
+    def append(self,key,item): v=super().append(key,item); self._wrote(key); return v
+    def touch(self,key): self._wrote(key)
+    @property
+    def history(self):
+        with self._track: return list(self._acc.values())
+    def readers(self,key): return list(dict.fromkeys(a.node for a in self.history if key in a.reads))
+    def writers(self,key): return list(dict.fromkeys(a.node for a in self.history if key in a.writes or key in a.deletes))
+    def write_set(self,node): return set().union(*(a.writes|a.deletes for a in self.history if a.node is node))
+    def changes(self,since=None):
+        with self._track: ks=[k for k,v in self._vers.items() if since is None or v>since]
+        return {k:self._data[k] for k in ks if k in self._data},{k for k in ks if k not in self._data}
+    def dump_changes(self,since=None): ver=self.version; return pickle.dumps((ver,*self.changes(since)))
+    def load_changes(self,blob):
+        ver,changed,deleted=pickle.loads(blob)
+        for k,v in changed.items(): self[k]=v
+        for k in deleted: self.pop(k,None)
+        return ver
+
+class MergeConflict(Exception):
+    def __init__(self,keys): super().__init__(f"Keys changed in the parent since the branch read them: {sorted(map(repr,keys))}"); self.keys=keys
+
+_merging=threading.Lock()
+
+class Overlay(MutableMapping):
+    def __init__(self,parent,on_conflict="raise"): self.parent,self.on_conflict,self.writes,self.deleted,self.base=parent,on_conflict,{},set(),{}
+    def _seen(self,key):
+        if key not in self.base: self.base[key]=self.parent.get(key,_MISSING)
+    def __getitem__(self,key):
+        if key in self.writes: return self.writes[key]
+        if key in self.deleted: raise KeyError(key)
+        self._seen(key); return self.parent[key]
+    def __setitem__(self,key,value): self._seen(key); self.writes[key]=value; self.deleted.discard(key)
+    def __delitem__(self,key):
+        if key not in self: raise KeyError(key)
+        self._seen(key); self.writes.pop(key,None); self.deleted.add(key)
+    def __contains__(self,key): return key in self.writes or (key not in self.deleted and key in self.parent)
+    def __iter__(self): return iter([*(k for k in list(self.parent) if k not in self.deleted and k not in self.writes),*self.writes])
+    def __len__(self): return sum(1 for _ in self)
+    def __repr__(self): return f"{type(self).__name__}(writes={self.writes!r}, deleted={self.deleted!r})"
+    @property
+    def root(self): return getattr(self.parent,"root",self.parent)
+    def changes(self): return dict(self.writes),set(self.deleted)
+    def conflicts(self): return {k for k in (*self.writes,*self.deleted) if self.parent.get(k,_MISSING) is not self.base[k]}
+    def merge(self,on_conflict=None):
+        on_conflict=on_conflict or self.on_conflict
+        with _merging:
+            bad=self.conflicts()
+            if bad and on_conflict=="raise": raise MergeConflict(bad)
+            for k,v in self.writes.items():
+                if k in bad:
+                    if on_conflict=="theirs": continue
+                    if callable(on_conflict): v=on_conflict(k,self.parent.get(k),v)
+                self.parent[k]=v
+            for k in self.deleted:
+                if k in bad and on_conflict=="theirs": continue
+                self.parent.pop(k,None)
+            self.writes,self.deleted,self.base={},set(),{}
+        return self.parent
@@ -0,0 +1,107 @@
+import asyncio, collections, contextvars, time
+from . import BatchNode, AsyncNode, _bounded, _tracer, _traced, _traced_async, _here, _within_async
+
+_sink=contextvars.ContextVar("pocketflow_stream_sink",default=None)
+
+async def _aiter(items):
+    if hasattr(items,"__aiter__"):
+        async for i in items: yield i
+    else:
+        for i in items or (): yield i
+
+class StreamBatchNode(BatchNode):
+    def post_stream(self,shared,prep_res,results): return self.post(shared,prep_res,list(results))
+    def _exec(self,items): return (super(BatchNode,self)._exec(i) for i in (items or ()))
+    def _run(self,shared):
+        run,t=lambda p: self.post_stream(shared,p,self._exec(p)),_tracer.get()
+        return _traced(self,t,shared,run) if t else run(self.prep(shared))
+
+class AsyncStreamBatchNode(AsyncNode,BatchNode):
+    def __init__(self,max_retries=1,wait=0,window=1,**kwargs): super().__init__(max_retries,wait,**kwargs); self.window=window
+    async def post_stream_async(self,shared,prep_res,results): return await self.post_async(shared,prep_res,[r async for r in results])
+    async def _exec(self,items):
+        pending,run=collections.deque(),_here(self)
+        try:
+            async for i in _aiter(items):
+                pending.append(asyncio.ensure_future(_within_async(run.fork(),AsyncNode._exec,self,i)))
+                if len(pending)>=self.window: yield await pending.popleft()
+            while pending: yield await pending.popleft()
+        finally:
+            for t in pending: t.cancel()
+    async def _run_async(self,shared):
+        run,t=lambda p: self.post_stream_async(shared,p,self._exec(p)),_tracer.get()
+        return await (_traced_async(self,t,shared,run) if t else run(await self.prep_async(shared)))
+
+class AsyncStreamNode(AsyncNode):
+    emit=True
+    async def exec_async(self,prep_res):
+        return
+        yield
+    async def post_stream_async(self,shared,prep_res,chunks): return await self.post_async(shared,prep_res,[c async for c in chunks])
+    async def _attempt(self,prep_res):
+        if self.throttle: await self.throttle.__aenter__()
+        gen=self.exec_async(prep_res)
+        try:
+            while True:
+                try: c=await (_bounded(gen.__anext__(),self.timeout,type(self).__name__) if self.timeout else gen.__anext__())
+                except StopAsyncIteration: return
+                yield c
+        finally:
+            await gen.aclose()
+            if self.throttle: await self.throttle.__aexit__(None,None,None)
+    async def _exec(self,prep_res):
+        t0,run=time.monotonic(),_here(self)
+        for run.cur_retry in range(self.max_retries):
+            started=False
+            try:
+                async for c in self._attempt(prep_res): started=True; yield c
+                return
+            except Exception as e:
+                if started: raise
+                d,t=None if run.cur_retry==self.max_retries-1 else self._delay(e,run,t0),_tracer.get()
+                if d is None:
+                    if t: t.on_fallback(self,e)
+                    async for c in _aiter(await self.exec_fallback_async(prep_res,e)): yield c
+                    return
+                if t: t.on_retry(self,run.cur_retry,e,d)
+                if d>0: await asyncio.sleep(d)
+    async def _tap(self,chunks,t0,tm):
+        put=_sink.get() if self.emit else None
+        async for c in chunks:
+            if "ttft" not in tm: tm["ttft"]=time.perf_counter()-t0
+            if put: await put(c)
+            yield c
+    async def _run_async(self,shared):
+        t,c,tm,a,err=_tracer.get(),time.perf_counter,{},None,None; s=c()
+        if t: t.on_node_start(self)
+        try:
+            p=await self.prep_async(shared); tm["prep"]=(s1:=c())-s
+            a=await self.post_stream_async(shared,p,self._tap(self._exec(p),s1,tm)); tm["exec"]=c()-s1; return a
+        except BaseException as x: err=x; raise
+        finally:
+            if t: tm["total"]=c()-s; t.on_node_end(self,a,tm,err)
+
+class FlowStream:
+    def __init__(self,flow,shared,buffer=1): self.flow,self.shared,self.buffer,self.result,self.ttft,self.chunks,self._task=flow,shared,buffer,None,None,0,None
+    async def _produce(self): _sink.set(self._q.put); self.result=await self.flow.run_async(self.shared)
+    def _chunk(self,c):
+        if self.ttft is None: self.ttft=time.perf_counter()-self._t0
+        self.chunks+=1; return c
+    def __aiter__(self): return self
+    async def __anext__(self):
+        if self._task is None: self._q,self._t0=asyncio.Queue(self.buffer),time.perf_counter(); self._task=asyncio.ensure_future(self._produce())
+        if self._q.empty() and not self._task.done():
+            get=asyncio.ensure_future(self._q.get())
+            try: done,_=await asyncio.wait({get,self._task},return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                if not get.done(): get.cancel()
+            if get in done: return self._chunk(get.result())
+        if not self._q.empty(): return self._chunk(self._q.get_nowait())
+        if not self._task.cancelled(): self._task.result()
+        raise StopAsyncIteration
+    async def aclose(self):
+        if self._task and not self._task.done(): self._task.cancel(); await asyncio.gather(self._task,return_exceptions=True)
+    async def __aenter__(self): return self
+    async def __aexit__(self,*exc): await self.aclose()
+    def __del__(self):
+        if self._task and not self._task.done(): self._task.cancel()
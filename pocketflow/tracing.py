@@ -0,0 +1,37 @@
+import math, threading
+from collections import defaultdict, deque
+from . import Tracer
+
+def percentile(samples,q):
+    if not samples: return None
+    s=sorted(samples); return s[max(0,math.ceil(q/100*len(s))-1)]
+
+class _Stats:
+    def __init__(self,maxlen): self.count,self.errors,self.retries,self.fallbacks,self.actions,self.timings=0,0,0,0,defaultdict(int),defaultdict(lambda:deque(maxlen=maxlen))
+
+class StatsTracer(Tracer):
+    def __init__(self,maxlen=10000): self.maxlen,self.stats,self.transitions,self._lock=maxlen,{},defaultdict(int),threading.Lock()
+    def _get(self,node):
+        name=type(node).__name__; st=self.stats.get(name)
+        if st is None: st=self.stats[name]=_Stats(self.maxlen)
+        return st
+    def on_node_end(self,node,action,timings,error):
+        with self._lock:
+            st=self._get(node); st.count+=1; st.errors+=error is not None; st.actions[action or "default"]+=1
+            for phase,d in timings.items(): st.timings[phase].append(d)
+    def on_retry(self,node,attempt,exc,delay):
+        with self._lock: self._get(node).retries+=1
+    def on_fallback(self,node,exc):
+        with self._lock: self._get(node).fallbacks+=1
+    def on_transition(self,flow,node,action,nxt):
+        with self._lock: self.transitions[(type(node).__name__,action or "default",type(nxt).__name__ if nxt else None)]+=1
+    def summary(self):
+        with self._lock:
+            return {name:{"count":st.count,"errors":st.errors,"retries":st.retries,"fallbacks":st.fallbacks,"actions":dict(st.actions),
+                          **{f"{phase}_p{q}":percentile(v,q) for phase,v in st.timings.items() for q in (50,95,99)}} for name,st in self.stats.items()}
+    def report(self):
+        rows=[f"{'node':<24}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'retries':>9}{'fallbk':>8}"]
+        for name,s in sorted(self.summary().items()):
+            ms=lambda k:f"{s[k]*1000:10.2f}" if s.get(k) is not None else f"{'-':>10}"
+            rows.append(f"{name:<24}{s['count']:>7}{ms('total_p50')}{ms('total_p95')}{ms('total_p99')}{s['retries']:>9}{s['fallbacks']:>8}")
+        return "\n".join(rows)
@@ -0,0 +1,98 @@
+import os, pickle, socket, sqlite3, threading, time, uuid
+from . import BatchFlow
+from .cache import stable_hash
+
+class Lease:
+    __slots__=("id","params","attempts","token")
+    def __init__(self,id,params,attempts,token): self.id,self.params,self.attempts,self.token=id,params,attempts,token
+    def __repr__(self): return f"Lease(id={self.id}, attempts={self.attempts}, params={self.params!r})"
+
+class ItemsFailed(Exception):
+    def __init__(self,errors): super().__init__(f"{len(errors)} queue item(s) failed: {dict(list(errors.items())[:5])}"); self.errors=errors
+
+class SQLiteQueue:
+    def __init__(self,path,job="default",visibility=60,max_attempts=3,table="pocketflow_queue"):
+        self.path,self.job,self.visibility,self.max_attempts,self.table=os.fspath(path),job,visibility,max_attempts,table; self._lock,self._db,self._pid=threading.Lock(),None,None
+    def __getstate__(self): return {k:v for k,v in self.__dict__.items() if k not in ("_lock","_db","_pid")}
+    def __setstate__(self,state): self.__dict__.update(state); self._lock,self._db,self._pid=threading.Lock(),None,None
+    def _conn(self):
+        if self._db is None or self._pid!=os.getpid():
+            db=sqlite3.connect(self.path,timeout=30,check_same_thread=False,isolation_level=None); db.execute("PRAGMA journal_mode=WAL")
+            db.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (job TEXT, id INTEGER, params BLOB, hash TEXT, status TEXT, attempts INTEGER DEFAULT 0, due REAL, token TEXT, worker TEXT, result BLOB, error TEXT, PRIMARY KEY (job, id))")
+            db.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_status ON {self.table} (job, status, due)")
+            self._db,self._pid=db,os.getpid()
+        return self._db
+    def _tx(self,fn):
+        with self._lock:
+            db=self._conn(); db.execute("BEGIN IMMEDIATE")
+            try: r=fn(db)
+            except BaseException: db.execute("ROLLBACK"); raise
+            db.execute("COMMIT"); return r
+    def put(self,items):
+        rows=[(self.job,i,pickle.dumps(p),stable_hash(p)) for i,p in enumerate(items)]
+        def fn(db):
+            old=[h for h, in db.execute(f"SELECT hash FROM {self.table} WHERE job=? ORDER BY id",(self.job,))]
+            if old and old!=[r[3] for r in rows]:
+                i=next((i for i,(h,r) in enumerate(zip(old,rows)) if h!=r[3]),min(len(old),len(rows)))
+                raise ValueError(f"Job '{self.job}' was enqueued with different items (first difference at index {i}); use a new job name or queue.clear()")
+            return db.executemany(f"INSERT OR IGNORE INTO {self.table} (job,id,params,hash,status) VALUES (?,?,?,?,'pending')",rows).rowcount
+        return self._tx(fn)
+    def lease(self,n=1,worker=None,visibility=None):
+        now,vis,t=time.time(),self.visibility if visibility is None else visibility,self.table
+        def fn(db):
+            db.execute(f"UPDATE {t} SET status='failed',token=NULL,error='lease expired' WHERE job=? AND status='leased' AND due<? AND attempts>=?",(self.job,now,self.max_attempts))
+            rows=db.execute(f"SELECT id,params,attempts FROM {t} WHERE job=? AND status IN ('pending','leased') AND (due IS NULL OR due<=?) ORDER BY id LIMIT ?",(self.job,now,n)).fetchall(); out=[]
+            for i,p,a in rows:
+                tok=uuid.uuid4().hex; db.execute(f"UPDATE {t} SET status='leased',attempts=?,due=?,token=?,worker=? WHERE job=? AND id=?",(a+1,now+vis,tok,worker,self.job,i)); out.append(Lease(i,pickle.loads(p),a+1,tok))
+            return out
+        return self._tx(fn)
+    def _settle(self,lease,sets,args): return self._tx(lambda db: db.execute(f"UPDATE {self.table} SET {sets} WHERE job=? AND id=? AND token=?",(*args,self.job,lease.id,lease.token)).rowcount==1)
+    def ack(self,lease,result=None): return self._settle(lease,"status='done',result=?,token=NULL,due=NULL,error=NULL",(pickle.dumps(result),))
+    def nack(self,lease,error=None,delay=0):
+        if lease.attempts>=self.max_attempts: return self._settle(lease,"status='failed',error=?,token=NULL,due=NULL",(error,))
+        return self._settle(lease,"status='pending',error=?,token=NULL,due=?",(error,time.time()+delay))
+    def extend(self,lease,visibility=None): return self._settle(lease,"due=?",(time.time()+(self.visibility if visibility is None else visibility),))
+    def progress(self):
+        now=time.time()
+        with self._lock: rows=self._conn().execute(f"SELECT status,due<? AND status='leased',COUNT(*) FROM {self.table} WHERE job=? GROUP BY 1,2",(now,self.job)).fetchall()
+        out=dict.fromkeys(("pending","leased","expired","done","failed"),0)
+        for s,exp,c in rows: out["expired" if exp else s]+=c
+        out["total"]=sum(out.values()); return out
+    def results(self):
+        with self._lock: rows=self._conn().execute(f"SELECT id,result FROM {self.table} WHERE job=? AND status='done' ORDER BY id",(self.job,)).fetchall()
+        return {i:pickle.loads(r) for i,r in rows}
+    def failures(self):
+        with self._lock: return dict(self._conn().execute(f"SELECT id,error FROM {self.table} WHERE job=? AND status='failed' ORDER BY id",(self.job,)).fetchall())
+    def clear(self): self._tx(lambda db: db.execute(f"DELETE FROM {self.table} WHERE job=?",(self.job,)))
+    def close(self):
+        with self._lock:
+            if self._db is not None: self._db.close(); self._db=None
+
+def _heartbeat(queue,lease,stop):
+    while not stop.wait(queue.visibility/3):
+        if not queue.extend(lease): return
+
+class QueueBatchFlow(BatchFlow):
+    def __init__(self,start=None,queue=None,worker=None,poll=0.5,retry_delay=0):
+        super().__init__(start); self.queue,self.worker,self.poll,self.retry_delay=queue,worker,poll,retry_delay
+    def post_item(self,shared,params,result): return result
+    def _item(self,shared,lease):
+        stop=threading.Event(); threading.Thread(target=_heartbeat,args=(self.queue,lease,stop),name="pocketflow-lease",daemon=True).start()
+        try: r=self.post_item(shared,lease.params,self._orch(shared,{**self.params,**lease.params},lease.id))
+        except Exception as e: self.queue.nack(lease,f"{type(e).__name__}: {e}",self.retry_delay); return 0
+        finally: stop.set()
+        return int(self.queue.ack(lease,r))
+    def work(self,shared=None,wait=True):
+        shared,done,me={} if shared is None else shared,0,self.worker or f"{socket.gethostname()}:{os.getpid()}"
+        while True:
+            leases=self.queue.lease(1,me)
+            for l in leases: done+=self._item(shared,l)
+            if leases: continue
+            p=self.queue.progress()
+            if not wait or not (p["pending"]+p["leased"]+p["expired"]): return done
+            time.sleep(self.poll)
+    def _run(self,shared):
+        pr=self.prep(shared) or []; self.queue.put(pr); self.work(shared)
+        bad=self.queue.failures()
+        if bad: raise ItemsFailed(bad)
+        res=self.queue.results(); return self.post(shared,pr,[res.get(i) for i in range(len(pr))])
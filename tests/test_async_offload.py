@@ -0,0 +1,96 @@
+import unittest
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import pocketflow
+from pocketflow import Node, Flow, AsyncFlow, AsyncParallelBatchFlow, thread_pool
+
+class BlockingNode(Node):
+    def prep(self, shared_storage):
+        time.sleep(0.1)
+        shared_storage.setdefault('threads', []).append(threading.current_thread().name)
+
+async def run_with_ticker(flow, shared):
+    async def tick():
+        while True:
+            await asyncio.sleep(0.01)
+            shared['ticks'] = shared.get('ticks', 0) + 1
+    shared['ticks'] = 0
+    ticker = asyncio.ensure_future(tick())
+    await flow.run_async(shared)
+    ticker.cancel()
+
+class TestAsyncOffload(unittest.TestCase):
+    def test_default_runs_on_event_loop(self):
+        shared = {}
+        asyncio.run(run_with_ticker(AsyncFlow(start=BlockingNode()), shared))
+        self.assertEqual(shared['ticks'], 0)
+        self.assertEqual(shared['threads'], ['MainThread'])
+
+    def test_flow_offload_keeps_loop_responsive(self):
+        shared = {}
+        asyncio.run(run_with_ticker(AsyncFlow(start=BlockingNode(), offload=True), shared))
+        self.assertGreater(shared['ticks'], 3)
+        self.assertTrue(shared['threads'][0].startswith('pocketflow'))
+
+    def test_per_node_flag(self):
+        on, off = BlockingNode(), BlockingNode()
+        on.offload = True
+        off.offload = False
+        on >> off
+        shared = {}
+        asyncio.run(AsyncFlow(start=on).run_async(shared))
+        self.assertTrue(shared['threads'][0].startswith('pocketflow'))
+        self.assertEqual(shared['threads'][1], 'MainThread')
+        shared = {}
+        asyncio.run(AsyncFlow(start=off, offload=True).run_async(shared))
+        self.assertEqual(shared['threads'], ['MainThread'])
+
+    def test_nested_sync_flow_and_compiled(self):
+        inner = Flow(start=BlockingNode())
+        flow = AsyncFlow(start=inner, offload=True).compile()
+        shared = {}
+        asyncio.run(run_with_ticker(flow, shared))
+        self.assertGreater(shared['ticks'], 3)
+
+    def test_shared_pool_sizing(self):
+        class Fanout(AsyncParallelBatchFlow):
+            async def prep_async(self, shared_storage):
+                return [{}] * 4
+        previous, pocketflow._threads[0] = pocketflow._threads[0], None
+        thread_pool(2)
+        try:
+            self.assertIs(thread_pool(), thread_pool())
+            self.assertIs(thread_pool(2), thread_pool())
+            shared = {}
+            start = time.monotonic()
+            asyncio.run(Fanout(start=BlockingNode(), offload=True).run_async(shared))
+            elapsed = time.monotonic() - start
+            self.assertEqual(len(shared['threads']), 4)
+            self.assertGreaterEqual(elapsed, 0.2)
+            self.assertLess(elapsed, 0.35)
+        finally:
+            pocketflow._threads[0].shutdown(wait=False)
+            pocketflow._threads[0] = previous
+
+    def test_concurrent_first_use_creates_one_pool(self):
+        previous, pocketflow._threads[0] = pocketflow._threads[0], None
+        try:
+            pools, barrier = [], threading.Barrier(8)
+            def grab():
+                barrier.wait()
+                pools.append(thread_pool())
+            ts = [threading.Thread(target=grab) for _ in range(8)]
+            for t in ts: t.start()
+            for t in ts: t.join()
+            self.assertEqual(len({id(p) for p in pools}), 1)
+        finally:
+            if pocketflow._threads[0]: pocketflow._threads[0].shutdown(wait=False)
+            pocketflow._threads[0] = previous
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import AsyncFlow, Tracer, trace
+from pocketflow.stream import AsyncStreamNode
+
+class FakeLLM(AsyncStreamNode):
+    def __init__(self, tokens=("Hello", " ", "world"), delay=0.01, **kwargs):
+        super().__init__(**kwargs)
+        self.tokens, self.delay, self.produced, self.closed = tokens, delay, 0, False
+    async def prep_async(self, shared_storage):
+        return shared_storage.get('prompt')
+    async def exec_async(self, prompt):
+        try:
+            for t in self.tokens:
+                await asyncio.sleep(self.delay)
+                self.produced += 1
+                yield t
+        finally:
+            self.closed = True
+    async def post_async(self, shared_storage, prep_result, chunks):
+        shared_storage['answer'] = "".join(map(str, chunks))
+        return "done"
+
+class Handoff(FakeLLM):
+    emit = False
+    async def post_stream_async(self, shared_storage, prep_result, chunks):
+        shared_storage['tokens'] = chunks
+
+class Upper(AsyncStreamNode):
+    async def prep_async(self, shared_storage):
+        return shared_storage['tokens']
+    async def exec_async(self, tokens):
+        async for t in tokens:
+            yield t.upper()
+
+async def collect(stream):
+    return [c async for c in stream]
+
+class TestAsyncStreamNode(unittest.TestCase):
+    def test_run_without_stream(self):
+        shared = {}
+        self.assertEqual(asyncio.run(AsyncFlow(start=FakeLLM()).run_async(shared)), "done")
+        self.assertEqual(shared['answer'], "Hello world")
+
+    def test_flow_stream_yields_tokens_as_they_arrive(self):
+        node = FakeLLM(delay=0.05)
+        flow, shared = AsyncFlow(start=node), {}
+        async def main():
+            s, seen = flow.stream(shared), []
+            async for tok in s:
+                seen.append((tok, time.perf_counter()))
+            return s, seen
+        start = time.perf_counter()
+        s, seen = asyncio.run(main())
+        self.assertEqual([t for t, _ in seen], ["Hello", " ", "world"])
+        self.assertLess(seen[0][1] - start, 0.09)
+        self.assertGreaterEqual(s.ttft, 0.04)
+        self.assertLess(s.ttft, 0.09)
+        self.assertEqual((s.result, s.chunks, shared['answer']), ("done", 3, "Hello world"))
+
+    def test_downstream_consumes_live_tokens(self):
+        up = Handoff(delay=0.02)
+        up >> Upper()
+        shared = {}
+        self.assertEqual(asyncio.run(collect(AsyncFlow(start=up).stream(shared))), ["HELLO", " ", "WORLD"])
+
+    def test_backpressure(self):
+        produced = []
+        class Counter(FakeLLM):
+            async def exec_async(self, prompt):
+                for i in range(20):
+                    produced.append(i)
+                    yield i
+        async def main():
+            ahead = []
+            async for i in AsyncFlow(start=Counter()).stream({}, buffer=2):
+                await asyncio.sleep(0.005)
+                ahead.append(len(produced) - i - 1)
+            return ahead
+        self.assertLessEqual(max(asyncio.run(main())), 4)
+
+    def test_consumer_cancels_producer(self):
+        nodes = []
+        class Endless(FakeLLM):
+            async def exec_async(self, prompt):
+                nodes.append(self)
+                async for t in super().exec_async(prompt):
+                    yield t
+        flow = AsyncFlow(start=Endless(tokens=[str(i) for i in range(1000)], delay=0.001))
+        async def main():
+            async with flow.stream({}) as s:
+                async for tok in s:
+                    if tok == "3":
+                        break
+            await asyncio.sleep(0.01)
+        asyncio.run(main())
+        self.assertTrue(nodes[0].closed)
+        self.assertLess(nodes[0].produced, 10)
+
+    def test_retry_before_first_token_and_fallback(self):
+        class Flaky(FakeLLM):
+            attempts = 0
+            async def exec_async(self, prompt):
+                Flaky.attempts += 1
+                if Flaky.attempts < 3:
+                    raise ConnectionError("reset")
+                async for t in super().exec_async(prompt):
+                    yield t
+        shared = {}
+        asyncio.run(collect(AsyncFlow(start=Flaky(max_retries=3)).stream(shared)))
+        self.assertEqual((Flaky.attempts, shared['answer']), (3, "Hello world"))
+
+        class Down(FakeLLM):
+            async def exec_async(self, prompt):
+                raise ConnectionError("down")
+                yield
+            async def exec_fallback_async(self, prompt, exc):
+                return ["sorry"]
+        self.assertEqual(asyncio.run(collect(AsyncFlow(start=Down(max_retries=2)).stream({}))), ["sorry"])
+
+    def test_error_after_first_token_propagates(self):
+        class Broken(FakeLLM):
+            async def exec_async(self, prompt):
+                yield "partial"
+                raise ConnectionError("dropped")
+        node = Broken(max_retries=3)
+        async def main():
+            seen = []
+            with self.assertRaises(ConnectionError):
+                async for tok in AsyncFlow(start=node).stream({}):
+                    seen.append(tok)
+            return seen
+        self.assertEqual(asyncio.run(main()), ["partial"])
+
+    def test_tracer_records_ttft(self):
+        class Rec(Tracer):
+            def on_node_end(self, node, action, timings, error):
+                self.timings = timings
+        rec = Rec()
+        with trace(rec):
+            asyncio.run(FakeLLM(delay=0.02).run_async({}))
+        self.assertGreaterEqual(rec.timings['ttft'], 0.015)
+        self.assertGreater(rec.timings['exec'], rec.timings['ttft'])
+
+    def test_concurrent_runs_report_their_own_ttft(self):
+        class Slow(FakeLLM):
+            async def exec_async(self, prompt):
+                await asyncio.sleep(prompt)
+                yield "x"
+            async def post_async(self, shared_storage, prep_result, chunks):
+                return prep_result
+        class Rec(Tracer):
+            def __init__(self):
+                self.ttft = {}
+            def on_node_end(self, node, action, timings, error):
+                self.ttft[action] = timings['ttft']
+        node, rec = Slow(), Rec()
+        async def main():
+            await asyncio.gather(node.run_async({'prompt': 0.05}), node.run_async({'prompt': 0.3}))
+        with trace(rec):
+            asyncio.run(main())
+        self.assertLess(rec.ttft[0.05], 0.2)
+        self.assertGreaterEqual(rec.ttft[0.3], 0.29)
+
+if __name__ == '__main__':
+    unittest.main()
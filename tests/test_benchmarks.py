@@ -0,0 +1,46 @@
+import unittest
+import io
+import json
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from benchmarks import CASES
+from benchmarks.__main__ import run, compare, main
+
+class TestBenchmarks(unittest.TestCase):
+    def test_all_cases_run(self):
+        results = run(list(CASES), 0.001, log=lambda *a: None)
+        for name in CASES:
+            self.assertTrue(any(k.startswith(name + ".") for k in results), name)
+        for r in results.values():
+            self.assertGreaterEqual(r["value"], 0)
+            self.assertTrue(r["unit"])
+
+    def test_compare_flags_regressions(self):
+        base = {"results": {"a.x": {"value": 100.0, "unit": "ns"}, "b.y": {"value": 10.0, "unit": "ms"}, "gone": {"value": 1.0, "unit": "ms"}}}
+        new = {"results": {"a.x": {"value": 125.0, "unit": "ns"}, "b.y": {"value": 8.0, "unit": "ms"}}}
+        rows, regressions = compare(base, new, 0.1)
+        self.assertEqual(regressions, ["a.x"])
+        self.assertEqual([r[-1] for r in rows], ["SLOWER", "faster"])
+
+    def test_cli_json_and_compare(self):
+        with tempfile.TemporaryDirectory() as d:
+            base, new = Path(d) / "base.json", Path(d) / "new.json"
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(main(["flow_hop", "--scale", "0.001", "--json", str(base)]), 0)
+            data = json.loads(base.read_text())
+            self.assertEqual(set(data["results"]), {"flow_hop.uncompiled", "flow_hop.compiled"})
+            for r in data["results"].values():
+                r["value"] *= 2
+            new.write_text(json.dumps(data))
+            out = io.StringIO()
+            with redirect_stdout(out):
+                self.assertEqual(main(["--compare", str(base), "--against", str(new)]), 1)
+                self.assertEqual(main(["--compare", str(new), "--against", str(base)]), 0)
+            self.assertIn("SLOWER", out.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, BatchNode, AsyncNode, AsyncBatchNode, Flow
+from pocketflow.cache import LRUCache, SQLiteCache, stable_hash
+
+class Embed(Node):
+    calls = 0
+    def prep(self, shared_storage):
+        return shared_storage['text']
+    def exec(self, text):
+        Embed.calls += 1
+        return [len(text), text.upper()]
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['embedding'] = exec_res
+
+exec_calls = []
+
+class EmbedAll(BatchNode):
+    def prep(self, shared_storage):
+        return shared_storage['texts']
+    def exec(self, text):
+        exec_calls.append(text)
+        return text.upper()
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['results'] = exec_res
+
+class Failing(Node):
+    def exec(self, prep_res):
+        raise ValueError("down")
+    def exec_fallback(self, prep_res, exc):
+        return "fallback"
+
+class AsyncEmbed(AsyncBatchNode):
+    async def prep_async(self, shared_storage):
+        return shared_storage['texts']
+    async def exec_async(self, text):
+        exec_calls.append(text)
+        return text[::-1]
+    async def post_async(self, shared_storage, prep_res, exec_res):
+        shared_storage['results'] = exec_res
+
+class TestStableHash(unittest.TestCase):
+    def test_order_independent_and_type_aware(self):
+        self.assertEqual(stable_hash({'a': 1, 'b': {2, 3}}), stable_hash({'b': {3, 2}, 'a': 1}))
+        self.assertNotEqual(stable_hash(1), stable_hash(1.0))
+        self.assertNotEqual(stable_hash("1"), stable_hash(b"1"))
+        self.assertNotEqual(stable_hash([1, 2]), stable_hash((1, 2)))
+        self.assertNotEqual(stable_hash(["ab", "c"]), stable_hash(["a", "bc"]))
+
+class TestNodeCache(unittest.TestCase):
+    def setUp(self):
+        Embed.calls = 0
+        exec_calls.clear()
+
+    def test_lru_hit_and_miss(self):
+        cache = LRUCache()
+        node = Embed(cache=cache)
+        for text in ["hi", "hi", "there"]:
+            shared = {'text': text}
+            Flow(start=node).run(shared)
+        self.assertEqual(shared['embedding'], [5, "THERE"])
+        self.assertEqual(Embed.calls, 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertAlmostEqual(cache.hit_rate, 1 / 3)
+
+    def test_lru_eviction_and_ttl(self):
+        cache = LRUCache(maxsize=2)
+        node = Embed(cache=cache)
+        for text in ["a", "b", "a", "c", "b"]:
+            node.run({'text': text})
+        self.assertEqual(Embed.calls, 4)  # "b" was evicted by "c"
+        self.assertEqual(len(cache), 2)
+        cache = LRUCache(ttl=0.01)
+        node = Embed(cache=cache)
+        node.run({'text': "x"})
+        time.sleep(0.02)
+        node.run({'text': "x"})
+        self.assertEqual(cache.hits, 0)
+
+    def test_fallback_results_are_not_cached(self):
+        cache = LRUCache()
+        node = Failing(cache=cache)
+        self.assertEqual(node._exec("q"), "fallback")
+        self.assertEqual(len(cache), 0)
+
+    def test_batch_runs_only_misses(self):
+        cache = LRUCache()
+        node = EmbedAll(cache=cache)
+        node.run({'texts': ["a", "b"]})
+        shared = {'texts': ["a", "c", "b", "d"]}
+        node.run(shared)
+        self.assertEqual(shared['results'], ["A", "C", "B", "D"])
+        self.assertEqual(exec_calls, ["a", "b", "c", "d"])
+        self.assertEqual(cache.hits, 2)
+
+    def test_keys_are_per_node_class(self):
+        cache = LRUCache()
+        self.assertNotEqual(cache.key(Embed(), "x"), cache.key(Failing(), "x"))
+        self.assertEqual(cache.key(Embed(), {"q": 1}), cache.key(Embed(), {"q": 1}))
+
+    def test_params_are_part_of_key(self):
+        class Translate(Node):
+            def exec(self, text):
+                return f"{text}->{self.params['lang']}"
+        cache = LRUCache()
+        a, b = Translate(cache=cache), Translate(cache=cache)
+        a.set_params({'lang': 'fr'})
+        b.set_params({'lang': 'de'})
+        self.assertEqual((a._exec("hi"), b._exec("hi")), ("hi->fr", "hi->de"))
+        self.assertEqual(cache.key(Embed(), "x"), f"{Embed.__module__}.Embed:{stable_hash('x')}")
+        shared_cache = LRUCache(params=False)
+        self.assertEqual(shared_cache.key(a, "hi"), shared_cache.key(b, "hi"))
+
+    def test_sqlite_persists_across_instances(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "cache.db")
+            cache = SQLiteCache(path)
+            Embed(cache=cache).run({'text': "persist"})
+            cache.close()
+            cache = SQLiteCache(path)
+            shared = {'text': "persist"}
+            Embed(cache=cache).run(shared)
+            self.assertEqual(shared['embedding'], [7, "PERSIST"])
+            self.assertEqual(Embed.calls, 1)
+            self.assertEqual((cache.hits, len(cache)), (1, 1))
+            cache.close()
+
+    def test_sqlite_ttl(self):
+        cache = SQLiteCache(":memory:", ttl=0.01)
+        Embed(cache=cache).run({'text': "x"})
+        time.sleep(0.02)
+        Embed(cache=cache).run({'text': "x"})
+        self.assertEqual((cache.hits, Embed.calls), (0, 2))
+
+    def test_async_batch(self):
+        cache = LRUCache()
+        node = AsyncEmbed(cache=cache)
+        asyncio.run(node.run_async({'texts': ["ab", "cd"]}))
+        shared = {'texts': ["cd", "ef"]}
+        asyncio.run(node.run_async(shared))
+        self.assertEqual(shared['results'], ["dc", "fe"])
+        self.assertEqual(exec_calls, ["ab", "cd", "ef"])
+
+if __name__ == '__main__':
+    unittest.main()
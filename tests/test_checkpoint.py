@@ -0,0 +1,238 @@
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, BatchFlow, AsyncNode, AsyncBatchFlow, AsyncParallelBatchFlow
+from pocketflow.checkpoint import Checkpointer, FileStore, SQLiteStore
+
+class MemoryStore:
+    def __init__(self):
+        self.saved = []
+    def save(self, checkpoint):
+        self.saved.append(checkpoint)
+    def load(self):
+        return self.saved[-1] if self.saved else None
+
+class Crash(Exception):
+    pass
+
+class Step(Node):
+    crash_on = None
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+    def prep(self, shared_storage):
+        key = (self.name, self.params.get('item'))
+        if key == Step.crash_on:
+            raise Crash(key)
+        shared_storage.setdefault('log', []).append(key)
+
+class AsyncStep(AsyncNode):
+    crash_on = None
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+    async def prep_async(self, shared_storage):
+        key = (self.name, self.params.get('item'))
+        if key == AsyncStep.crash_on:
+            raise Crash(key)
+        shared_storage.setdefault('log', []).append(key)
+
+class Items(BatchFlow):
+    def prep(self, shared_storage):
+        return [{'item': i} for i in range(5)]
+
+class AsyncItems(AsyncBatchFlow):
+    async def prep_async(self, shared_storage):
+        return [{'item': i} for i in range(5)]
+
+class AsyncParallelItems(AsyncParallelBatchFlow):
+    async def prep_async(self, shared_storage):
+        return [{'item': i} for i in range(5)]
+
+def chain(cls, *names):
+    nodes = [cls(n) for n in names]
+    for a, b in zip(nodes, nodes[1:]):
+        a >> b
+    return nodes[0]
+
+class TestCheckpoint(unittest.TestCase):
+    def tearDown(self):
+        Step.crash_on = AsyncStep.crash_on = None
+
+    def test_flow_resumes_at_failed_node(self):
+        store = MemoryStore()
+        flow = Flow(start=chain(Step, "a", "b", "c"))
+        flow.checkpointer = Checkpointer(store)
+        Step.crash_on = ("c", None)
+        with self.assertRaises(Crash):
+            flow.run({'user': 1})
+        checkpoint = store.load()
+        self.assertEqual(checkpoint.positions[None][0], 2)
+        Step.crash_on = None
+        shared = {}
+        flow.resume(checkpoint, shared)
+        self.assertEqual(shared['log'], [("a", None), ("b", None), ("c", None)])
+        self.assertEqual(shared['user'], 1)
+        self.assertIn(None, store.load().done)
+
+    def test_batch_flow_skips_completed_items(self):
+        store = MemoryStore()
+        flow = Items(start=Flow(start=chain(Step, "load", "save")))
+        flow.checkpointer = Checkpointer(store)
+        Step.crash_on = ("load", 3)
+        with self.assertRaises(Crash):
+            flow.run({})
+        checkpoint = store.load()
+        self.assertEqual(sorted(checkpoint.done), [0, 1, 2])
+        Step.crash_on = None
+        shared = {}
+        flow.resume(checkpoint, shared)
+        self.assertEqual([k for k in shared['log'] if k[1] >= 3], [("load", 3), ("save", 3), ("load", 4), ("save", 4)])
+        self.assertEqual(len(shared['log']), 10)
+
+    def test_resume_mid_item_uses_node_position(self):
+        store = MemoryStore()
+        flow = Items(start=chain(Step, "load", "save"))
+        flow.checkpointer = Checkpointer(store)
+        Step.crash_on = ("save", 1)
+        with self.assertRaises(Crash):
+            flow.run({})
+        Step.crash_on = None
+        shared = {}
+        flow.resume(store.load(), shared)
+        self.assertEqual(shared['log'][:4], [("load", 0), ("save", 0), ("load", 1), ("save", 1)])
+        self.assertEqual(shared['log'].count(("load", 1)), 1)
+
+    def test_save_interval(self):
+        store = MemoryStore()
+        flow = Items(start=chain(Step, "a", "b"))
+        flow.checkpointer = Checkpointer(store, every=4)
+        flow.run({})
+        # 10 hops -> saves after hop 4 and 8, plus the final flush
+        self.assertEqual(len(store.saved), 3)
+        self.assertEqual(len(store.load().done), 5)
+
+    def test_fresh_run_resets_progress(self):
+        store = MemoryStore()
+        flow = Items(start=Step("a"))
+        flow.checkpointer = Checkpointer(store)
+        flow.run({})
+        shared = {}
+        flow.run(shared)
+        self.assertEqual(len(shared['log']), 5)
+
+    def test_exclude_keys(self):
+        store = MemoryStore()
+        flow = Flow(start=Step("a"))
+        flow.checkpointer = Checkpointer(store, exclude=['index'])
+        flow.run({'index': object(), 'keep': 1})
+        shared = {'index': 'rebuilt'}
+        flow.resume(store.load(), shared)
+        self.assertEqual((shared['index'], shared['keep']), ('rebuilt', 1))
+
+    def test_errors(self):
+        flow = Flow(start=Step("a"))
+        with self.assertRaises(ValueError):
+            flow.resume(None)
+        flow.checkpointer = Checkpointer(MemoryStore())
+        flow.run({})
+        other = Flow(start=chain(Step, "a", "b"))
+        other.checkpointer = Checkpointer(MemoryStore())
+        with self.assertRaises(ValueError):
+            other.resume(flow.checkpointer.store.load())
+
+    def test_nested_checkpointed_flow_reruns_each_time(self):
+        class Again(Node):
+            def post(self, shared_storage, prep_res, exec_res):
+                return "again" if len(shared_storage['log']) < 3 else "stop"
+        inner = Flow(start=Step("inner"))
+        inner.checkpointer = Checkpointer(MemoryStore())
+        inner.run({})
+        again = Again()
+        inner >> again
+        again - "again" >> inner
+        again - "stop" >> Step("done")
+        shared = {'log': []}
+        Flow(start=inner).run(shared)
+        self.assertEqual(shared['log'], [("inner", None)] * 3 + [("done", None)])
+        self.assertEqual(len(inner.checkpointer.store.saved), 2)
+
+    def test_checkpointer_does_not_compile_flow(self):
+        class Count(Node):
+            def post(self, shared_storage, prep_res, exec_res):
+                self.visits = getattr(self, 'visits', 0) + 1
+                shared_storage.setdefault('visits', []).append(self.visits)
+                return "again" if len(shared_storage['visits']) < 3 else "done"
+        inner = Flow(start=Step("i"))
+        start = Count()
+        start - "again" >> start
+        start - "done" >> inner
+        flow = Flow(start=start)
+        flow.checkpointer = Checkpointer(MemoryStore())
+        shared = {}
+        flow.run(shared)
+        self.assertIsNone(flow._plan)
+        self.assertIsNone(inner._plan)
+        # nodes aren't copied per hop, compiled or not
+        self.assertEqual(shared['visits'], [1, 2, 3])
+        inner >> Step("added")
+        flow.run(shared)
+        self.assertIn(("added", None), shared['log'])
+
+class TestStores(unittest.TestCase):
+    def run_store(self, store):
+        flow = Items(start=Step("a"))
+        flow.checkpointer = Checkpointer(store)
+        Step.crash_on = ("a", 2)
+        try:
+            with self.assertRaises(Crash):
+                flow.run({})
+        finally:
+            Step.crash_on = None
+        checkpoint = store.load()
+        self.assertEqual(sorted(checkpoint.done), [0, 1])
+        shared = {}
+        flow.resume(checkpoint, shared)
+        self.assertEqual([k[1] for k in shared['log']], [0, 1, 2, 3, 4])
+
+    def test_file_store(self):
+        with tempfile.TemporaryDirectory() as d:
+            store = FileStore(os.path.join(d, "run.ckpt"))
+            self.assertIsNone(store.load())
+            self.run_store(store)
+            store.clear()
+            self.assertIsNone(store.load())
+            self.assertEqual(os.listdir(d), [])
+
+    def test_sqlite_store(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "ckpt.db")
+            self.run_store(SQLiteStore(path, name="job-1"))
+            self.assertIsNone(SQLiteStore(path, name="job-2").load())
+            self.assertIsNotNone(SQLiteStore(path, name="job-1").load())
+
+class TestAsyncCheckpoint(unittest.TestCase):
+    def tearDown(self):
+        AsyncStep.crash_on = None
+
+    def test_async_batch_resume(self):
+        for cls in (AsyncItems, AsyncParallelItems):
+            store = MemoryStore()
+            flow = cls(start=chain(AsyncStep, "a", "b"))
+            flow.checkpointer = Checkpointer(store)
+            AsyncStep.crash_on = ("b", 2)
+            with self.assertRaises(Crash):
+                asyncio.run(flow.run_async({}))
+            AsyncStep.crash_on = None
+            shared = {}
+            asyncio.run(flow.resume_async(store.load(), shared))
+            self.assertEqual(sorted(k[1] for k in shared['log'] if k[0] == "b"), [0, 1, 2, 3, 4])
+            self.assertEqual(shared['log'].count(("a", 2)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, AsyncNode, AsyncFlow
+from pocketflow.fanout import FanOut, AsyncFanOut, CANCELLED
+
+class Retrieve(Node):
+    def __init__(self, source, delay=0.1):
+        super().__init__()
+        self.source, self.delay = source, delay
+    def exec(self, prep_res):
+        time.sleep(self.delay)
+        return f"{self.source}:{self.params.get('q')}"
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage.setdefault('docs', {})[self.source] = exec_res
+        return self.source
+
+class AsyncRetrieve(AsyncNode):
+    def __init__(self, source, delay=0.1):
+        super().__init__()
+        self.source, self.delay = source, delay
+    async def exec_async(self, prep_res):
+        await asyncio.sleep(self.delay)
+        return f"{self.source}:{self.params.get('q')}"
+    async def post_async(self, shared_storage, prep_res, exec_res):
+        shared_storage.setdefault('docs', {})[self.source] = exec_res
+        return self.source
+
+class Join(Node):
+    def prep(self, shared_storage):
+        shared_storage['joined'] = sorted(shared_storage['docs'].values())
+
+class Failing(Node):
+    def exec(self, prep_res):
+        raise ValueError("source down")
+
+class Collect(FanOut):
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['branch_results'] = exec_res
+
+class AsyncCollect(AsyncFanOut):
+    async def post_async(self, shared_storage, prep_res, exec_res):
+        shared_storage['branch_results'] = exec_res
+
+class TestFanOut(unittest.TestCase):
+    def test_branches_run_concurrently_then_join(self):
+        web = Flow(start=Retrieve("web"))
+        fan = Collect(web, Retrieve("db"), Retrieve("docs"))
+        fan >> Join()
+        flow = Flow(start=fan)
+        flow.set_params({'q': 'x'})
+        shared = {}
+        start = time.monotonic()
+        flow.run(shared)
+        self.assertLess(time.monotonic() - start, 0.25)
+        self.assertEqual(shared['joined'], ["db:x", "docs:x", "web:x"])
+        self.assertEqual(shared['branch_results'], ["web", "db", "docs"])
+
+    def test_first_n(self):
+        fan = Collect(Retrieve("slow", 0.3), Retrieve("fast", 0.01), Retrieve("mid", 0.05), first=2)
+        shared = {}
+        start = time.monotonic()
+        Flow(start=fan).run(shared)
+        self.assertLess(time.monotonic() - start, 0.2)
+        self.assertEqual(shared['branch_results'], [CANCELLED, "fast", "mid"])
+
+    def test_failure_propagates(self):
+        with self.assertRaises(ValueError):
+            Flow(start=FanOut(Retrieve("a", 0), Failing())).run({})
+
+    def test_rejects_async_branches(self):
+        with self.assertRaises(TypeError):
+            FanOut(AsyncRetrieve("a"))
+
+class TestAsyncFanOut(unittest.TestCase):
+    def test_async_and_sync_branches(self):
+        fan = AsyncCollect(AsyncRetrieve("web"), AsyncFlow(start=AsyncRetrieve("db")), Retrieve("files"))
+        fan >> Join()
+        flow = AsyncFlow(start=fan)
+        flow.set_params({'q': 'y'})
+        shared = {}
+        start = time.monotonic()
+        asyncio.run(flow.run_async(shared))
+        self.assertLess(time.monotonic() - start, 0.25)
+        self.assertEqual(shared['branch_results'], ["web", "db", "files"])
+        self.assertEqual(shared['joined'], ["db:y", "files:y", "web:y"])
+
+    def test_first_n_cancels_rest(self):
+        fan = AsyncCollect(AsyncRetrieve("slow", 1), AsyncRetrieve("fast", 0.01), first=1)
+        shared = {}
+        start = time.monotonic()
+        asyncio.run(AsyncFlow(start=fan).run_async(shared))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(shared['branch_results'], [CANCELLED, "fast"])
+        self.assertEqual(shared['docs'], {"fast": "fast:None"})
+
+    def test_failure_cancels_siblings(self):
+        class Boom(AsyncNode):
+            async def exec_async(self, prep_res):
+                raise ValueError("boom")
+        shared = {}
+        async def main():
+            with self.assertRaises(ValueError):
+                await AsyncFlow(start=AsyncFanOut(AsyncRetrieve("slow", 0.1), Boom())).run_async(shared)
+            await asyncio.sleep(0.15)
+        asyncio.run(main())
+        self.assertNotIn('docs', shared)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+import unittest
+import asyncio
+import pickle
+import sys
+import warnings
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, AsyncNode, AsyncFlow, AsyncParallelBatchFlow
+
+class NumberNode(Node):
+    def __init__(self, number):
+        super().__init__()
+        self.number = number
+    def prep(self, shared_storage):
+        shared_storage['current'] = self.number
+
+class AddNode(Node):
+    def __init__(self, number):
+        super().__init__()
+        self.number = number
+    def prep(self, shared_storage):
+        shared_storage['current'] += self.number
+
+class CheckPositiveNode(Node):
+    def post(self, shared_storage, prep_result, proc_result):
+        return 'positive' if shared_storage['current'] >= 0 else 'negative'
+
+class EndSignalNode(Node):
+    def post(self, shared_storage, prep_result, exec_result):
+        return "done"
+
+class ParamRecorder(Node):
+    def prep(self, shared_storage):
+        shared_storage.setdefault('seen', []).append(self.params.get('tag'))
+
+class AsyncParamRecorder(AsyncNode):
+    async def prep_async(self, shared_storage):
+        await asyncio.sleep(0.01)
+        shared_storage.setdefault('seen', []).append(self.params['tag'])
+
+def build_cycle():
+    n1, check, sub3, end = NumberNode(10), CheckPositiveNode(), AddNode(-3), EndSignalNode()
+    n1 >> check
+    check - 'positive' >> sub3
+    check - 'negative' >> end
+    sub3 >> check
+    return Flow(start=n1)
+
+class TestFlowCompile(unittest.TestCase):
+    def test_compiled_matches_uncompiled(self):
+        """A compiled flow takes the same path and returns the same action"""
+        plain, compiled = {}, {}
+        self.assertEqual(build_cycle().run(plain), "done")
+        self.assertEqual(build_cycle().compile().run(compiled), "done")
+        self.assertEqual(plain, compiled)
+        self.assertEqual(compiled['current'], -2)
+
+    def test_plan_structure(self):
+        """Nodes get integer ids and every action maps through the jump table"""
+        flow = build_cycle().compile()
+        plan = flow._plan
+        self.assertIs(plan.nodes[0], flow.start_node)
+        self.assertEqual(len(plan.nodes), 4)
+        self.assertEqual(set(plan.acts), {'default', 'positive', 'negative'})
+        for row in plan.jump:
+            self.assertEqual(len(row), len(plan.acts))
+
+    def test_compile_requires_start(self):
+        with self.assertRaises(ValueError):
+            Flow().compile()
+
+    def test_compile_rejects_non_node_successor(self):
+        n = NumberNode(1)
+        n.successors['default'] = "not a node"
+        with self.assertRaises(TypeError):
+            Flow(start=n).compile()
+
+    def test_start_resets_plan(self):
+        flow = build_cycle().compile()
+        flow.start(NumberNode(7))
+        self.assertIsNone(flow._plan)
+        shared = {}
+        flow.run(shared)
+        self.assertEqual(shared['current'], 7)
+
+    def test_missing_action_warns(self):
+        class ActionNode(Node):
+            def post(self, *args): return "specific_action"
+        start = ActionNode()
+        start >> NumberNode(1)
+        flow = Flow(start=start).compile()
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            self.assertEqual(flow.run({}), "specific_action")
+            self.assertEqual(len(w), 1)
+            self.assertIn("Flow ends: 'specific_action' not found in ['default']", str(w[-1].message))
+
+    def test_nested_flows_are_compiled(self):
+        inner = Flow(start=ParamRecorder())
+        outer = Flow(start=inner)
+        inner >> ParamRecorder()
+        outer.set_params({'tag': 'x'})
+        outer.compile()
+        self.assertIsNotNone(inner._plan)
+        shared = {}
+        outer.run(shared)
+        self.assertEqual(shared['seen'], ['x', 'x'])
+
+    def test_original_nodes_untouched(self):
+        """Params land on per-run instances, not on the graph's nodes"""
+        rec = ParamRecorder()
+        flow = Flow(start=rec).compile()
+        flow.set_params({'tag': 'run'})
+        flow.run({})
+        self.assertEqual(rec.params, {})
+
+class TestAsyncFlowCompile(unittest.TestCase):
+    def test_async_mixed_nodes(self):
+        start = AsyncParamRecorder()
+        start >> ParamRecorder()
+        flow = AsyncFlow(start=start).compile()
+        flow.set_params({'tag': 'a'})
+        shared = {}
+        asyncio.run(flow.run_async(shared))
+        self.assertEqual(shared['seen'], ['a', 'a'])
+
+    def test_parallel_runs_keep_params_isolated(self):
+        class Fanout(AsyncParallelBatchFlow):
+            async def prep_async(self, shared_storage):
+                return [{'tag': t} for t in "abcd"]
+        start = AsyncParamRecorder()
+        start >> AsyncParamRecorder()
+        flow = Fanout(start=start).compile()
+        shared = {}
+        asyncio.run(flow.run_async(shared))
+        self.assertEqual(sorted(shared['seen']), sorted("aabbccdd"))
+
+class TestRunState(unittest.TestCase):
+    def test_core_nodes_have_no_instance_dict(self):
+        for node in (Node(), Flow(), AsyncNode(), AsyncFlow(), AsyncParallelBatchFlow()):
+            self.assertFalse(hasattr(node, '__dict__'), type(node).__name__)
+
+    def test_hops_do_not_copy_nodes(self):
+        seen = []
+        class Same(Node):
+            def post(self, shared_storage, prep_res, exec_res):
+                seen.append(self)
+                return "again" if len(seen) < 3 else None
+        node = Same()
+        node - "again" >> node
+        with mock.patch("copy.copy", side_effect=AssertionError("copied")), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            Flow(start=node).run({})
+            Flow(start=node).compile().run({})
+        self.assertTrue(all(n is node for n in seen))
+
+    def test_hooks_and_custom_attributes(self):
+        node = Node(max_retries=3, timeout=5)
+        node.cache = "c"
+        self.assertEqual((node.max_retries, node.timeout, node.cache, node.retry), (3, 5, "c", None))
+        flow = Flow()
+        flow.checkpointer = "ck"
+        self.assertEqual(flow.checkpointer, "ck")
+        class Custom(Node):
+            timeout = 7
+        custom = Custom()
+        custom.extra = 1
+        self.assertEqual((custom.timeout, custom.extra), (7, 1))
+        self.assertEqual(Custom(timeout=2).timeout, 2)
+
+    def test_params_and_retry_live_on_the_run(self):
+        class Flaky(Node):
+            def exec(self, prep_res):
+                if self.cur_retry < 1: raise ValueError()
+                return (self.params['tag'], self.cur_retry)
+            def post(self, shared_storage, prep_res, exec_res):
+                shared_storage['out'] = exec_res
+        node = Flaky(max_retries=2)
+        flow = Flow(start=node)
+        flow.set_params({'tag': 'x'})
+        shared = {}
+        flow.run(shared)
+        self.assertEqual(shared['out'], ('x', 1))
+        self.assertEqual((node.params, node.cur_retry), ({}, 0))
+        node2 = pickle.loads(pickle.dumps(Node(max_retries=4)))
+        self.assertEqual((node2.max_retries, node2.params), (4, {}))
+
+if __name__ == '__main__':
+    unittest.main()
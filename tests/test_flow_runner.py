@@ -0,0 +1,128 @@
+import unittest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, AsyncNode, AsyncFlow
+from pocketflow.runner import FlowRunner
+
+class Gate(AsyncNode):
+    """Parks the run until shared['gate'] is set, tracking peak concurrency in shared['stats']."""
+    async def prep_async(self, shared):
+        return shared
+    async def exec_async(self, shared):
+        stats = shared['stats']
+        stats['now'] += 1
+        stats['peak'] = max(stats['peak'], stats['now'])
+        try:
+            await shared['gate'].wait()
+        finally:
+            stats['now'] -= 1
+        if shared.get('fail'):
+            raise RuntimeError("boom")
+        return shared['name']
+    async def post_async(self, shared, prep_res, exec_res):
+        shared['out'] = exec_res
+        return exec_res
+
+def gated(stats, gate, name, **extra):
+    return {'stats': stats, 'gate': gate, 'name': name, **extra}
+
+class TestFlowRunner(unittest.TestCase):
+    def test_runs_share_one_compiled_graph(self):
+        flow = AsyncFlow(start=Gate())
+        runner = FlowRunner(flow)
+        self.assertIsNotNone(flow._plan)
+        async def main():
+            gate, stats = asyncio.Event(), {'now': 0, 'peak': 0}
+            gate.set()
+            return await asyncio.gather(*(runner.run(gated(stats, gate, i)) for i in range(5)))
+        self.assertEqual(asyncio.run(main()), [0, 1, 2, 3, 4])
+        self.assertEqual(runner.metrics()['done'], 5)
+
+    def test_global_and_tenant_limits(self):
+        runner = FlowRunner(AsyncFlow(start=Gate()), max_concurrency=4, per_tenant=1, tenant_limits={'big': 2})
+        async def main():
+            gate = asyncio.Event()
+            stats = {t: {'now': 0, 'peak': 0} for t in ('a', 'b', 'big')}
+            runs = [runner.submit(gated(stats[t], gate, t), tenant=t) for t in ('a', 'a', 'b', 'big', 'big', 'big')]
+            for _ in range(5):
+                await asyncio.sleep(0)
+            m = runner.metrics()
+            gate.set()
+            await runner.join()
+            return runs, stats, m
+        runs, stats, m = asyncio.run(main())
+        self.assertEqual(m['active'], 4)
+        self.assertEqual(m['queued'], 2)
+        self.assertEqual(m['tenants']['a'], {'queued': 1, 'active': 1})
+        self.assertEqual(stats['a']['peak'], 1)
+        self.assertEqual(stats['big']['peak'], 2)
+        self.assertTrue(all(r.status == "done" for r in runs))
+        self.assertEqual(runner._tenants, {})
+
+    def test_status_results_and_failures(self):
+        runner = FlowRunner(AsyncFlow(start=Gate()))
+        async def main():
+            gate, stats = asyncio.Event(), {'now': 0, 'peak': 0}
+            ok = runner.submit(gated(stats, gate, "ok"), run_id="r1")
+            bad = runner.submit(gated(stats, gate, "bad", fail=True))
+            await asyncio.sleep(0)
+            before = runner.status("r1")
+            gate.set()
+            self.assertEqual(await ok.wait(), "ok")
+            with self.assertRaises(RuntimeError):
+                await bad.wait()
+            with self.assertRaises(ValueError):
+                runner.submit({}, run_id="r1")
+            return before, ok, bad
+        before, ok, bad = asyncio.run(main())
+        self.assertEqual(before, "running")
+        self.assertIs(runner.get("r1"), ok)
+        self.assertEqual((ok.status, ok.shared['out']), ("done", "ok"))
+        self.assertEqual(bad.status, "failed")
+        self.assertIsInstance(bad.error, RuntimeError)
+        self.assertEqual(runner.metrics()['failed'], 1)
+
+    def test_cancel_queued_and_running(self):
+        runner = FlowRunner(AsyncFlow(start=Gate()), max_concurrency=1)
+        async def main():
+            gate, stats = asyncio.Event(), {'now': 0, 'peak': 0}
+            running = runner.submit(gated(stats, gate, 1))
+            queued = runner.submit(gated(stats, gate, 2))
+            await asyncio.sleep(0)
+            self.assertTrue(runner.cancel(queued.id))
+            self.assertTrue(runner.cancel(running.id))
+            await runner.join()
+            self.assertFalse(runner.cancel(running.id))
+            with self.assertRaises(asyncio.CancelledError):
+                await running.wait()
+            return running, queued
+        running, queued = asyncio.run(main())
+        self.assertEqual((running.status, queued.status), ("cancelled", "cancelled"))
+        self.assertEqual(runner.metrics()['cancelled'], 2)
+        self.assertEqual(runner.metrics()['active'], 0)
+
+    def test_sync_flow_and_run_id(self):
+        class Echo(Node):
+            def post(self, shared, prep_res, exec_res):
+                shared['run_id'] = self.ctx.run_id
+        runner = FlowRunner(Flow(start=Echo()))
+        async def main():
+            r = runner.submit({}, run_id="job-7")
+            await r.wait()
+            return r
+        self.assertEqual(asyncio.run(main()).shared['run_id'], "job-7")
+
+    def test_keeps_a_bounded_history(self):
+        runner = FlowRunner(AsyncFlow(start=AsyncNode()), keep=2)
+        async def main():
+            for i in range(4):
+                await runner.run({})
+        asyncio.run(main())
+        self.assertEqual(len(runner.runs), 2)
+        self.assertEqual(runner.metrics()['done'], 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+import unittest
+import sys
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, AsyncNode, AsyncFlow, BatchFlow
+from pocketflow.graph import FlowValidationError, returned
+
+class Start(Node):
+    def prep(self, shared_storage):
+        shared_storage.setdefault('current', 3)
+
+class Check(Node):
+    def post(self, shared_storage, prep_res, exec_res):
+        if shared_storage['current'] > 0:
+            return "positive"
+        return "negative"
+
+class Typo(Node):
+    def post(self, shared_storage, prep_res, exec_res):
+        return "aprove" if shared_storage.get('ok') else "reject"
+
+class Decrement(Node):
+    def prep(self, shared_storage):
+        shared_storage['current'] -= 1
+
+class Dynamic(Node):
+    def post(self, shared_storage, prep_res, exec_res):
+        return shared_storage.get('next')
+
+class Finish(Node):
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['finished'] = True
+        return "done"
+
+class Think(Node):
+    def prep(self, shared_storage):
+        shared_storage['current'] -= 1
+    def post(self, shared_storage, prep_res, exec_res):
+        if shared_storage['current'] > 0:
+            return "continue"
+        return "end"
+
+class AsyncStep(AsyncNode):
+    async def post_async(self, shared_storage, prep_res, exec_res):
+        return "next"
+
+def kinds(graph):
+    return sorted(i.kind for g in graph.walk() for i in g.issues)
+
+class TestFlowValidate(unittest.TestCase):
+    def test_clean_loop_passes(self):
+        start, check, dec, finish = Start(), Check(), Decrement(), Finish()
+        start >> check
+        check - "positive" >> dec
+        check - "negative" >> finish
+        dec >> check
+        flow = Flow(start=start)
+        graph = flow.validate()
+        self.assertIs(graph.plan, flow._plan)
+        self.assertEqual(graph.issues, [])
+        self.assertEqual(graph.actions[check], {"positive", "negative"})
+        self.assertEqual(graph.preds[check], [(start, "default"), (dec, "default")])
+        self.assertEqual(flow._plan.loose, (False,) * 4)
+        shared = {}
+        self.assertEqual(flow.run(shared), "done")
+        self.assertEqual(shared['current'], 0)
+
+    def test_missing_target_raises(self):
+        review, approve, reject = Typo(), Finish(), Finish()
+        review - "approve" >> approve
+        review - "reject" >> reject
+        flow = Flow(start=review)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            with self.assertRaises(FlowValidationError) as cm:
+                flow.validate()
+        self.assertEqual([i.kind for i in cm.exception.issues], ["missing_target"])
+        self.assertIn("'aprove'", str(cm.exception))
+        self.assertIn("edge 'approve' is never taken", str(w[0].message))
+        self.assertIn("Finish#1: only reachable", str(w[1].message))
+        self.assertEqual(flow._plan.loose, (True, False, False))
+
+    def test_cycle_without_exit(self):
+        a, b = Decrement(), Decrement()
+        a >> b
+        b >> a
+        with self.assertRaises(FlowValidationError) as cm:
+            Flow(start=a).validate()
+        self.assertEqual([i.kind for i in cm.exception.issues], ["cycle_without_exit"])
+
+    def test_loop_exits_through_unwired_action(self):
+        think = Think()
+        think - "continue" >> think
+        flow = Flow(start=think)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            graph = flow.validate()
+        self.assertEqual(kinds(graph), ["ends_flow"])
+        self.assertIn("returns 'end', which ends the flow", str(w[0].message))
+        self.assertEqual(flow._plan.loose, (True,))
+        shared = {'current': 3}
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.assertEqual(flow.run(shared), "end")
+        self.assertEqual(shared['current'], 0)
+        class Terminal(Think):
+            terminal = ("end",)
+        think = Terminal()
+        think - "continue" >> think
+        flow = Flow(start=think)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.assertEqual(flow.validate().issues, [])
+            self.assertEqual(flow.run({'current': 2}), "end")
+        self.assertEqual(flow._plan.loose, (False,))
+
+    def test_dynamic_actions_keep_runtime_warning(self):
+        router, a, b = Dynamic(), Finish(), Finish()
+        router - "a" >> a
+        router - "b" >> b
+        flow = Flow(start=router)
+        graph = flow.validate()
+        self.assertIsNone(graph.actions[router])
+        self.assertEqual(flow._plan.loose, (True, False, False))
+        with self.assertWarns(UserWarning):
+            flow.run({'next': "c"})
+
+    def test_declared_actions(self):
+        class Router(Dynamic):
+            actions = ("a", "b")
+        router, a = Router(), Finish()
+        router - "a" >> a
+        with self.assertRaises(FlowValidationError):
+            Flow(start=router).validate()
+
+    def test_nested_flows_and_async_paths(self):
+        inner = Flow(start=Check())
+        inner.start_node - "positive" >> Finish()
+        inner.start_node - "negative" >> Finish()
+        outer = AsyncFlow(start=AsyncStep())
+        outer.start_node - "next" >> inner
+        tail = Node()
+        tail.offload = True
+        inner - "done" >> tail
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            graph = outer.validate()
+        self.assertEqual(graph.actions[inner], {"done"})
+        self.assertEqual(kinds(graph), ["sync_in_async"])
+        self.assertIn("AsyncFlow > Flow#1", str(w[0].message))
+        self.assertIn(inner, graph.flows)
+        sync = Flow(start=outer)
+        with self.assertRaises(FlowValidationError) as cm:
+            sync.validate()
+        self.assertEqual(cm.exception.issues[0].kind, "async_in_sync")
+
+    def test_batch_flow_returns_default(self):
+        batch, after = BatchFlow(start=Start()), Finish()
+        batch >> after
+        graph = Flow(start=batch).validate()
+        self.assertEqual(graph.actions[batch], {"default"})
+
+    def test_return_inference(self):
+        def branches(x):
+            try:
+                if x:
+                    return "a"
+                return "b" if x else None
+            finally:
+                pass
+        def falls(x):
+            if x:
+                return "a"
+        def loops(x):
+            while True:
+                return "a"
+        async def computed(x):
+            return f"{x}"
+        self.assertEqual(returned(branches), {"a", "b", "default"})
+        self.assertEqual(returned(falls), {"a", "default"})
+        self.assertIsNone(returned(loops))
+        self.assertIsNone(returned(computed))
+        self.assertEqual(returned(AsyncNode.post_async), {"default"})
+
+if __name__ == '__main__':
+    unittest.main()
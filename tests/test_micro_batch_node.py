@@ -0,0 +1,100 @@
+import unittest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import AsyncFlow, AsyncParallelBatchFlow
+from pocketflow.microbatch import AsyncMicroBatchNode
+
+class Embed(AsyncMicroBatchNode):
+    """Fake batch embedding API: records each call, fails items listed in params['flaky'] on their first try."""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls, self.failed = [], set()
+    async def prep_async(self, shared_storage):
+        return shared_storage['texts']
+    async def exec_batch_async(self, texts):
+        self.calls.append((list(texts), self.cur_retry, self.params.get('tag')))
+        await asyncio.sleep(0.01)
+        out = []
+        for t in texts:
+            if t in self.params.get('broken', ()) or (t in self.params.get('flaky', ()) and t not in self.failed):
+                self.failed.add(t)
+                out.append(ValueError(t))
+            else:
+                out.append(t.upper())
+        return out
+    async def exec_fallback_async(self, text, exc):
+        return f"fallback:{text}:{self.cur_retry}"
+    async def post_async(self, shared_storage, prep_res, exec_res):
+        shared_storage['vectors'] = exec_res
+
+def run(node, texts, params=None):
+    node.set_params(params or {})
+    shared = {'texts': texts}
+    asyncio.run(node.run_async(shared))
+    return shared['vectors']
+
+class TestMicroBatchNode(unittest.TestCase):
+    def test_groups_by_max_batch_size(self):
+        node = Embed(max_batch_size=4)
+        texts = [f"t{i}" for i in range(10)]
+        self.assertEqual(run(node, texts), [t.upper() for t in texts])
+        self.assertEqual([len(c[0]) for c in node.calls], [4, 4, 2])
+        self.assertEqual((node.batch_calls, node.mean_batch_size), (3, 10 / 3))
+
+    def test_concurrent_runs_share_batches(self):
+        node = Embed(max_batch_size=16, max_wait_ms=20)
+        flow = AsyncFlow(start=node)
+        runs = [{'texts': [f"{r}a", f"{r}b"]} for r in range(3)]
+        async def main():
+            await asyncio.gather(*(flow.run_async(s) for s in runs))
+        asyncio.run(main())
+        self.assertEqual(len(node.calls), 1)
+        self.assertEqual(sorted(node.calls[0][0]), ["0a", "0b", "1a", "1b", "2a", "2b"])
+        self.assertEqual([s['vectors'] for s in runs], [[f"{r}A", f"{r}B"] for r in range(3)])
+
+    def test_failed_items_retry_alone(self):
+        node = Embed(max_retries=2, max_batch_size=8)
+        self.assertEqual(run(node, ["a", "b", "c"], {'flaky': {"b"}}), ["A", "B", "C"])
+        self.assertEqual([(c[0], c[1]) for c in node.calls], [(["a", "b", "c"], 0), (["b"], 1)])
+
+    def test_fallback_per_item(self):
+        node = Embed(max_retries=2)
+        self.assertEqual(run(node, ["a", "b"], {'broken': {"a"}}), ["fallback:a:1", "B"])
+
+    def test_whole_batch_failure_and_bad_length(self):
+        class Broken(Embed):
+            async def exec_batch_async(self, texts):
+                self.calls.append(list(texts))
+                if len(self.calls) == 1:
+                    raise RuntimeError("provider down")
+                return [t.upper() for t in texts][:1]
+        node = Broken(max_retries=2)
+        self.assertEqual(run(node, ["a", "b"]), ["fallback:a:1", "fallback:b:1"])
+        self.assertEqual(len(node.calls), 2)
+
+    def test_params_are_not_mixed(self):
+        class Items(AsyncParallelBatchFlow):
+            async def prep_async(self, shared_storage):
+                return [{'tag': 1}, {'tag': 2}]
+        node = Embed(max_wait_ms=20)
+        shared = {'texts': ["x", "y"]}
+        asyncio.run(Items(start=node).run_async(shared))
+        self.assertEqual(sorted((c[2], c[0]) for c in node.calls), [(1, ["x", "y"]), (2, ["x", "y"])])
+
+    def test_default_exec_batch_calls_exec_async(self):
+        class Double(AsyncMicroBatchNode):
+            async def exec_async(self, item):
+                if item < 0:
+                    raise ValueError(item)
+                return item * 2
+            async def exec_fallback_async(self, item, exc):
+                return None
+        node = Double(max_batch_size=2)
+        self.assertEqual(asyncio.run(node._exec([1, -1, 3])), [2, None, 6])
+        self.assertEqual(node.batch_calls, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, AsyncNode, AsyncParallelBatchFlow
+from pocketflow.pool import ThreadPoolBatchFlow
+from pocketflow.store import Overlay, MergeConflict, SharedStore
+
+class BigIndex:
+    def __init__(self):
+        self.vectors = list(range(100000))
+    def __deepcopy__(self, memo):
+        raise AssertionError("index must not be copied")
+
+class Scratch(AsyncNode):
+    async def prep_async(self, shared_storage):
+        shared_storage['current'] = self.params['i']
+        await asyncio.sleep(0.01)
+        return shared_storage['current'], len(shared_storage['index'].vectors)
+    async def post_async(self, shared_storage, prep_result, exec_result):
+        shared_storage[f"result_{self.params['i']}"] = prep_result
+
+class Counter(AsyncNode):
+    async def prep_async(self, shared_storage):
+        n = shared_storage['count']
+        await asyncio.sleep(0.01)
+        shared_storage['count'] = n + 1
+
+class SyncScratch(Node):
+    def prep(self, shared_storage):
+        shared_storage['current'] = self.params['i']
+        return shared_storage['current']
+    def post(self, shared_storage, prep_result, exec_result):
+        shared_storage[f"result_{self.params['i']}"] = prep_result
+
+class Batch(AsyncParallelBatchFlow):
+    async def prep_async(self, shared_storage):
+        return [{'i': i} for i in range(5)]
+
+class ThreadBatch(ThreadPoolBatchFlow):
+    def prep(self, shared_storage):
+        return [{'i': i} for i in range(5)]
+
+class TestOverlay(unittest.TestCase):
+    def test_reads_fall_through_and_writes_stay_local(self):
+        parent = {'a': 1, 'b': 2}
+        o = Overlay(parent)
+        o['a'] = 10
+        del o['b']
+        o['c'] = 3
+        self.assertEqual(dict(o), {'a': 10, 'c': 3})
+        self.assertEqual(parent, {'a': 1, 'b': 2})
+        self.assertEqual(o.changes(), ({'a': 10, 'c': 3}, {'b'}))
+        o.merge()
+        self.assertEqual(parent, {'a': 10, 'c': 3})
+        self.assertEqual(o.changes(), ({}, set()))
+
+    def test_conflict_detected(self):
+        parent = {'n': 0}
+        a, b = Overlay(parent), Overlay(parent)
+        a['n'] = a['n'] + 1
+        b['n'] = b['n'] + 1
+        a.merge()
+        with self.assertRaises(MergeConflict) as cm:
+            b.merge()
+        self.assertEqual(cm.exception.keys, {'n'})
+        self.assertEqual(parent, {'n': 1})
+
+    def test_conflict_policies(self):
+        for policy, expected in (("ours", 'b'), ("theirs", 'a'), (lambda k, old, new: old + new, 'ab')):
+            parent = {'x': ''}
+            a, b = Overlay(parent), Overlay(parent, on_conflict=policy)
+            a['x'], b['x'] = 'a', 'b'
+            a.merge()
+            b.merge()
+            self.assertEqual(parent['x'], expected)
+
+    def test_disjoint_writes_merge(self):
+        parent = SharedStore({'index': BigIndex()})
+        branches = [Overlay(parent) for _ in range(3)]
+        for i, o in enumerate(branches):
+            o[f"k{i}"] = i
+        for o in branches:
+            o.merge()
+        self.assertEqual(sorted(k for k in parent if k.startswith('k')), ['k0', 'k1', 'k2'])
+
+class TestFlowOverlay(unittest.TestCase):
+    def test_async_parallel_batch_flow_isolates_branches(self):
+        flow = Batch(start=Scratch())
+        flow.overlay = Overlay
+        shared = {'index': BigIndex(), 'current': None}
+        with self.assertRaises(MergeConflict):
+            asyncio.run(flow.run_async(shared))
+        flow.overlay = lambda shared: Overlay(shared, on_conflict="ours")
+        asyncio.run(flow.run_async(shared))
+        for i in range(5):
+            self.assertEqual(shared[f"result_{i}"], (i, 100000))
+
+    def test_lost_update_raises(self):
+        flow = Batch(start=Counter())
+        flow.overlay = Overlay
+        shared = {'count': 0}
+        with self.assertRaises(MergeConflict):
+            asyncio.run(flow.run_async(shared))
+
+    def test_failed_run_merges_nothing(self):
+        class Boom(Scratch):
+            async def post_async(self, shared_storage, prep_result, exec_result):
+                shared_storage['partial'] = True
+                if self.params['i'] == 3:
+                    raise ValueError("boom")
+        flow = Batch(start=Boom())
+        flow.overlay = Overlay
+        shared = {'index': BigIndex()}
+        with self.assertRaises(ValueError):
+            asyncio.run(flow.run_async(shared))
+        self.assertNotIn('partial', shared)
+
+    def test_thread_pool_batch_flow(self):
+        flow = ThreadBatch(start=SyncScratch(), max_workers=5)
+        flow.overlay = lambda shared: Overlay(shared, on_conflict="ours")
+        shared = {}
+        flow.run(shared)
+        self.assertEqual([shared[f"result_{i}"] for i in range(5)], list(range(5)))
+        self.assertEqual(shared['current'], 4)
+
+    def test_rejects_checkpointer(self):
+        from pocketflow.checkpoint import Checkpointer
+        class Store:
+            def save(self, checkpoint):
+                self.saved = checkpoint
+        for flow in (Batch(start=Scratch()), ThreadBatch(start=SyncScratch())):
+            flow.overlay = Overlay
+            flow.checkpointer = Checkpointer(Store())
+            with self.assertRaises(ValueError):
+                if isinstance(flow, Batch):
+                    asyncio.run(flow.run_async({'index': BigIndex()}))
+                else:
+                    flow.run({})
+
+if __name__ == '__main__':
+    unittest.main()
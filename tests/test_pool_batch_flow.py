@@ -0,0 +1,122 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, BatchFlow
+from pocketflow.pool import ThreadPoolBatchFlow, ProcessPoolBatchFlow
+from pocketflow.store import MergeConflict
+
+class LoadGrades(Node):
+    def prep(self, shared_storage):
+        return (self.params['class'], self.params['student'])
+    def exec(self, key):
+        time.sleep(0.05)
+        return sum(map(ord, key[1])) % 10
+    def post(self, shared_storage, prep_res, grade):
+        shared_storage.setdefault('results', {}).setdefault(prep_res[0], {})[prep_res[1]] = grade
+        shared_storage.setdefault('threads', {})[prep_res] = threading.current_thread().name
+        shared_storage.setdefault('pids', {})[prep_res] = os.getpid()
+        return "done" if grade % 2 else "default"
+
+class ClassFlow(BatchFlow):
+    def prep(self, shared_storage):
+        return [{'student': s} for s in ("ann", "bob", "cy")]
+
+class SchoolFlow(ThreadPoolBatchFlow):
+    def prep(self, shared_storage):
+        return [{'class': c} for c in ("a", "b", "c", "d")]
+
+class Students(ThreadPoolBatchFlow):
+    def prep(self, shared_storage):
+        return [{'class': 'a', 'student': s} for s in shared_storage['students']]
+    def post_item(self, shared_storage, params, result):
+        shared_storage.setdefault('order', []).append(params['student'])
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['actions'] = exec_res
+
+class ProcessStudents(ProcessPoolBatchFlow):
+    def prep(self, shared_storage):
+        return [{'class': c, 'student': s} for c in ("a", "b") for s in ("ann", "bob")]
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['actions'] = exec_res
+
+class Cleanup(Node):
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage.pop('tmp', None)
+        shared_storage['cfg'].pop(self.params['student'], None)
+
+class AppendOut(Node):
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['out'].append(self.params['student'])
+
+class ProcessItems(ProcessPoolBatchFlow):
+    def prep(self, shared_storage):
+        return [{'student': s} for s in ("ann", "bob")]
+
+EXPECTED = {s: sum(map(ord, s)) % 10 for s in ("ann", "bob", "cy")}
+
+class TestThreadPoolBatchFlow(unittest.TestCase):
+    def test_runs_concurrently_and_nests(self):
+        shared = {}
+        start = time.monotonic()
+        SchoolFlow(start=ClassFlow(start=LoadGrades()), max_workers=4).run(shared)
+        # 4 classes in parallel, 3 students each in sequence
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(shared['results'], {c: EXPECTED for c in "abcd"})
+        self.assertEqual(len(set(shared['threads'].values())), 4)
+
+    def test_ordered_post_collection(self):
+        class Slow(LoadGrades):
+            def exec(self, key):
+                time.sleep({'ann': 0.1, 'bob': 0.0, 'cy': 0.05}[key[1]])
+                return super().exec(key)
+        shared = {'students': ["ann", "bob", "cy"]}
+        Students(start=Slow()).run(shared)
+        self.assertEqual(shared['order'], ["ann", "bob", "cy"])
+        self.assertEqual(shared['actions'], ["default" if EXPECTED[s] % 2 == 0 else "done" for s in shared['order']])
+        shared = {'students': ["ann", "bob", "cy"]}
+        Students(start=Slow(), ordered=False).run(shared)
+        self.assertEqual(shared['order'], ["bob", "cy", "ann"])
+        self.assertEqual(shared['actions'], ["default" if EXPECTED[s] % 2 == 0 else "done" for s in ["ann", "bob", "cy"]])
+
+    def test_bounded_workers(self):
+        shared = {'students': ["s%d" % i for i in range(6)]}
+        start = time.monotonic()
+        Students(start=LoadGrades(), max_workers=2).run(shared)
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        self.assertEqual(len(set(shared['threads'].values())), 2)
+
+    def test_error_propagates(self):
+        class Boom(LoadGrades):
+            def exec(self, key):
+                if key[1] == "bob":
+                    raise ValueError("bad file")
+                return 1
+        with self.assertRaises(ValueError):
+            Students(start=Boom()).run({'students': ["ann", "bob"]})
+
+class TestProcessPoolBatchFlow(unittest.TestCase):
+    def test_merges_worker_changes(self):
+        shared = {'results': {'z': {'old': 1}}, 'untouched': [1, 2]}
+        ProcessStudents(start=Flow(start=LoadGrades()), max_workers=2).run(shared)
+        self.assertEqual(shared['results'], {'z': {'old': 1}, 'a': {s: EXPECTED[s] for s in ("ann", "bob")}, 'b': {s: EXPECTED[s] for s in ("ann", "bob")}})
+        self.assertEqual(shared['untouched'], [1, 2])
+        self.assertNotIn(os.getpid(), shared['pids'].values())
+        self.assertEqual(len(shared['actions']), 4)
+
+    def test_deletions_are_applied(self):
+        shared = {'tmp': 1, 'cfg': {'ann': 1, 'bob': 2, 'cy': 3}}
+        ProcessItems(start=Cleanup(), max_workers=2).run(shared)
+        self.assertEqual(shared, {'cfg': {'cy': 3}})
+
+    def test_conflicting_writes_raise(self):
+        with self.assertRaises(MergeConflict) as cm:
+            ProcessItems(start=AppendOut(), max_workers=2).run({'out': []})
+        self.assertEqual(cm.exception.keys, {('out',)})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Flow
+from pocketflow.pool import ProcessPoolBatchNode
+
+class SquareNode(ProcessPoolBatchNode):
+    def prep(self, shared_storage):
+        return shared_storage['numbers']
+    def exec(self, x):
+        return (x * x, os.getpid())
+    def post(self, shared_storage, prep_result, exec_result):
+        shared_storage['squares'] = [r for r, _ in exec_result]
+        shared_storage['pids'] = {pid for _, pid in exec_result}
+
+class FlakyNode(ProcessPoolBatchNode):
+    def prep(self, shared_storage):
+        return shared_storage['numbers']
+    def exec(self, x):
+        if x < 0:
+            raise ValueError("negative")
+        if x % 2 and self.cur_retry == 0:
+            raise RuntimeError("first attempt fails")
+        return (x, self.cur_retry)
+    def exec_fallback(self, x, exc):
+        return ("fallback", type(exc).__name__)
+    def post(self, shared_storage, prep_result, exec_result):
+        shared_storage['results'] = exec_result
+
+class ScaleNode(ProcessPoolBatchNode):
+    def prep(self, shared_storage):
+        return [1, 2, 3]
+    def exec(self, x):
+        return x * self.params['k']
+    def post(self, shared_storage, prep_result, exec_result):
+        shared_storage['scaled'] = exec_result
+
+class TestProcessPoolBatchNode(unittest.TestCase):
+    def test_results_in_order(self):
+        shared = {'numbers': list(range(50))}
+        SquareNode(max_workers=2, chunksize=7).run(shared)
+        self.assertEqual(shared['squares'], [x * x for x in range(50)])
+        self.assertNotIn(os.getpid(), shared['pids'])
+
+    def test_retry_and_fallback_on_workers(self):
+        shared = {'numbers': [0, 1, 2, -1, 3]}
+        FlakyNode(max_retries=2, max_workers=2, chunksize=2).run(shared)
+        self.assertEqual(shared['results'], [
+            (0, 0), (1, 1), (2, 0), ("fallback", "ValueError"), (3, 1)])
+
+    def test_empty_input(self):
+        shared = {'numbers': []}
+        SquareNode().run(shared)
+        self.assertEqual(shared['squares'], [])
+
+    def test_shared_executor_in_flow(self):
+        with ProcessPoolExecutor(2) as pool:
+            node = SquareNode(executor=pool)
+            shared = {'numbers': [3, 1, 2]}
+            Flow(start=node).run(shared)
+            Flow(start=node).run(shared)
+        self.assertEqual(shared['squares'], [9, 1, 4])
+
+    def test_params_reach_workers(self):
+        shared = {}
+        flow = Flow(start=ScaleNode(max_workers=2))
+        flow.set_params({'k': 10})
+        flow.run(shared)
+        self.assertEqual(shared['scaled'], [10, 20, 30])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import asyncio
+import random
+import sys
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, AsyncNode, Retry
+
+class RateLimited(Exception):
+    def __init__(self, retry_after=None, headers=None):
+        super().__init__("rate limited")
+        if retry_after is not None:
+            self.retry_after = retry_after
+        if headers is not None:
+            self.response = type("Response", (), {"headers": headers})()
+
+class Flaky(Node):
+    def __init__(self, errors, **kwargs):
+        super().__init__(**kwargs)
+        self.errors = list(errors)
+        self.retries_seen = []
+    def exec(self, prep_res):
+        self.retries_seen.append(self.cur_retry)
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+    def exec_fallback(self, prep_res, exc):
+        return f"fallback:{type(exc).__name__}"
+
+class AsyncFlaky(AsyncNode):
+    def __init__(self, errors, **kwargs):
+        super().__init__(**kwargs)
+        self.errors = list(errors)
+        self.retries_seen = []
+    async def exec_async(self, prep_res):
+        self.retries_seen.append(self.cur_retry)
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+    async def exec_fallback_async(self, prep_res, exc):
+        return f"fallback:{type(exc).__name__}"
+
+def run_sync(node):
+    clock = [0.0]
+    def fake_sleep(d):
+        clock[0] += d
+    with mock.patch("pocketflow.time.sleep", side_effect=fake_sleep) as sleep, \
+         mock.patch("pocketflow.time.monotonic", side_effect=lambda: clock[0]):
+        result = node._exec(None)
+    return result, [c.args[0] for c in sleep.call_args_list]
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_exponential_backoff(self):
+        node = Flaky([ValueError()] * 3, max_retries=5, retry=Retry(base=1, factor=2, jitter=False))
+        result, sleeps = run_sync(node)
+        self.assertEqual(result, "ok")
+        self.assertEqual(sleeps, [1, 2, 4])
+        self.assertEqual(node.retries_seen, [0, 1, 2, 3])
+
+    def test_max_delay(self):
+        node = Flaky([ValueError()] * 4, max_retries=5, retry=Retry(base=1, factor=10, max_delay=5, jitter=False))
+        self.assertEqual(run_sync(node)[1], [1, 5, 5, 5])
+
+    def test_full_jitter(self):
+        random.seed(0)
+        node = Flaky([ValueError()] * 3, max_retries=4, retry=Retry(base=1, factor=2))
+        sleeps = run_sync(node)[1]
+        for d, cap in zip(sleeps, [1, 2, 4]):
+            self.assertTrue(0 <= d <= cap)
+        self.assertNotEqual(sleeps, [1, 2, 4])
+
+    def test_exception_filter(self):
+        node = Flaky([KeyError()], max_retries=5, retry=Retry(retry_on=(ValueError,)))
+        result, sleeps = run_sync(node)
+        self.assertEqual(result, "fallback:KeyError")
+        self.assertEqual(sleeps, [])
+        self.assertEqual(node.retries_seen, [0])
+
+    def test_max_elapsed(self):
+        node = Flaky([ValueError()] * 5, max_retries=10, retry=Retry(base=1, factor=2, jitter=False, max_elapsed=3.5))
+        result, sleeps = run_sync(node)
+        self.assertEqual(result, "fallback:ValueError")
+        self.assertEqual(sleeps, [1, 2])
+
+    def test_retry_after_hints(self):
+        errors = [RateLimited(retry_after=7), RateLimited(headers={"retry-after": "3"}), RateLimited(headers={"retry-after": "soon"})]
+        node = Flaky(errors, max_retries=4, retry=Retry(base=1, factor=2, jitter=False))
+        result, sleeps = run_sync(node)
+        self.assertEqual(result, "ok")
+        self.assertEqual(sleeps, [7.0, 3.0, 4])
+
+    def test_class_level_policy_and_fixed_wait(self):
+        class Patient(Flaky):
+            retry = Retry(base=2, jitter=False)
+        self.assertEqual(run_sync(Patient([ValueError()], max_retries=2))[1], [2])
+        self.assertEqual(run_sync(Flaky([ValueError()], max_retries=2, wait=0.5))[1], [0.5])
+
+    def test_last_attempt_goes_to_fallback(self):
+        node = Flaky([ValueError()] * 2, max_retries=2, retry=Retry(jitter=False))
+        self.assertEqual(run_sync(node), ("fallback:ValueError", [1]))
+
+class TestAsyncRetryPolicy(unittest.TestCase):
+    def test_async_backoff_and_cur_retry(self):
+        node = AsyncFlaky([RateLimited(retry_after=0.5), ValueError()], max_retries=3, retry=Retry(base=1, jitter=False))
+        with mock.patch("pocketflow.asyncio.sleep") as sleep:
+            result = asyncio.run(node._exec(None))
+        self.assertEqual(result, "ok")
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.5, 2])
+        self.assertEqual(node.retries_seen, [0, 1, 2])
+
+    def test_async_filter(self):
+        node = AsyncFlaky([KeyError()], max_retries=3, retry=Retry(retry_on=ValueError))
+        self.assertEqual(asyncio.run(node._exec(None)), "fallback:KeyError")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, AsyncNode, AsyncFlow, AsyncParallelBatchNode, BatchFlow, RunContext
+
+class Record(Node):
+    def prep(self, shared_storage):
+        shared_storage.setdefault('ctx', []).append(self.ctx)
+    def exec(self, prep_res):
+        return self.ctx
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['ctx'].append(exec_res)
+
+class FlakyItems(AsyncParallelBatchNode):
+    async def exec_async(self, item):
+        await asyncio.sleep(0.01 * (3 - item))
+        if self.cur_retry < item:
+            raise ValueError(item)
+        return (item, self.ctx.cur_retry)
+
+class TestRunContext(unittest.TestCase):
+    def test_context_is_reachable_from_every_phase(self):
+        a, b = Record(), Record()
+        a >> b
+        flow = Flow(start=a)
+        flow.set_params({'job': 1})
+        shared = {}
+        flow.run(shared)
+        ctxs = shared['ctx']
+        self.assertEqual(len(ctxs), 4)
+        self.assertTrue(all(isinstance(c, RunContext) for c in ctxs))
+        self.assertEqual([c.node for c in ctxs], [a, a, b, b])
+        self.assertEqual({c.run_id for c in ctxs}, {ctxs[0].run_id})
+        self.assertEqual(ctxs[0].params, {'job': 1})
+        self.assertIsNone(ctxs[0].deadline)
+        self.assertEqual(a.params, {})
+
+    def test_each_run_gets_its_own_id(self):
+        class Batch(BatchFlow):
+            def prep(self, shared_storage):
+                return [{'i': 0}, {'i': 1}]
+        flow = Batch(start=Record())
+        first, second = {}, {}
+        flow.run(first)
+        flow.run(second)
+        ids = lambda s: {c.run_id for c in s['ctx']}
+        self.assertEqual(len(ids(first)), 1)
+        self.assertNotEqual(ids(first), ids(second))
+        self.assertEqual([c.params['i'] for c in first['ctx']], [0, 0, 1, 1])
+
+    def test_parallel_items_keep_their_own_retry_count(self):
+        node = FlakyItems(max_retries=3)
+        result = asyncio.run(node._exec([0, 1, 2]))
+        self.assertEqual(result, [(0, 0), (1, 1), (2, 2)])
+
+    def test_one_graph_serves_concurrent_runs(self):
+        class Slow(AsyncNode):
+            async def exec_async(self, prep_res):
+                await asyncio.sleep(0.01)
+                return self.ctx
+            async def post_async(self, shared_storage, prep_res, exec_res):
+                shared_storage['ctx'] = exec_res
+        node = Slow()
+        flow = AsyncFlow(start=node)
+        runs = [{}, {}, {}]
+        async def main():
+            await asyncio.gather(*(flow.run_async(s) for s in runs))
+        asyncio.run(main())
+        self.assertTrue(all(s['ctx'].node is node for s in runs))
+        self.assertEqual(len({s['ctx'].run_id for s in runs}), 3)
+
+    def test_deadline_from_flow_timeout(self):
+        class Check(AsyncNode):
+            async def exec_async(self, prep_res):
+                return self.ctx.remaining()
+            async def post_async(self, shared_storage, prep_res, exec_res):
+                shared_storage['left'] = exec_res
+        inner = AsyncFlow(start=Check(), timeout=10)
+        outer = AsyncFlow(start=inner, timeout=1)
+        shared = {}
+        asyncio.run(outer.run_async(shared))
+        self.assertTrue(0 < shared['left'] <= 1)
+
+    def test_retries_stop_at_the_deadline(self):
+        class Slow(AsyncNode):
+            async def exec_async(self, prep_res):
+                raise ValueError()
+            async def exec_fallback_async(self, prep_res, exc):
+                return "fallback"
+            async def post_async(self, shared_storage, prep_res, exec_res):
+                shared_storage['out'] = exec_res
+        flow = AsyncFlow(start=Slow(max_retries=5, wait=5), timeout=1)
+        shared, t0 = {}, time.monotonic()
+        asyncio.run(flow.run_async(shared))
+        self.assertEqual(shared['out'], "fallback")
+        self.assertLess(time.monotonic() - t0, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import AsyncNode, AsyncFlow, AsyncParallelBatchFlow
+from pocketflow.scheduler import PriorityScheduler
+from pocketflow.runner import FlowRunner
+
+class Work(AsyncNode):
+    async def prep_async(self, shared_storage):
+        return shared_storage
+    async def exec_async(self, shared_storage):
+        shared_storage['order'].append(self.params['name'])
+        shared_storage['now'] = shared_storage.get('now', 0) + 1
+        shared_storage['peak'] = max(shared_storage.get('peak', 0), shared_storage['now'])
+        await asyncio.sleep(self.params.get('delay', 0.01))
+        shared_storage['now'] -= 1
+        if self.params.get('fail'):
+            raise RuntimeError(self.params['name'])
+
+class Jobs(AsyncParallelBatchFlow):
+    async def prep_async(self, shared_storage):
+        return shared_storage['jobs']
+
+def run(jobs, **kwargs):
+    sched = PriorityScheduler(**kwargs)
+    shared = {'jobs': jobs, 'order': []}
+    asyncio.run(Jobs(start=Work(), scheduler=sched).run_async(shared))
+    return shared, sched
+
+class TestPriorityScheduler(unittest.TestCase):
+    def test_priority_then_earliest_deadline(self):
+        jobs = [{'name': "bulk1", 'priority': 5}, {'name': "bulk2", 'priority': 5},
+                {'name': "late", 'priority': 0, 'deadline': 10}, {'name': "soon", 'priority': 0, 'deadline': 1},
+                {'name': "none", 'priority': 0}]
+        shared, _ = run(jobs, max_concurrency=1)
+        self.assertEqual(shared['order'], ["soon", "late", "none", "bulk1", "bulk2"])
+
+    def test_bounded_concurrency(self):
+        shared, sched = run([{'name': i} for i in range(12)], max_concurrency=3)
+        self.assertEqual(shared['peak'], 3)
+        self.assertEqual(sorted(shared['order']), list(range(12)))
+        self.assertEqual((sched.running, sched.queued), (0, 0))
+
+    def test_aging_prevents_starvation(self):
+        sched = PriorityScheduler(max_concurrency=1, aging=0.01)
+        order = []
+        async def job(name):
+            order.append(name)
+            await asyncio.sleep(0.01)
+        async def main():
+            fs = [sched.submit(job, "first", priority=0), sched.submit(job, "old-bulk", priority=2)]
+            for i in range(4):
+                await asyncio.sleep(0.01)
+                fs.append(sched.submit(job, f"new{i}", priority=0))
+            await asyncio.gather(*fs)
+        asyncio.run(main())
+        self.assertLess(order.index("old-bulk"), order.index("new3"))
+        self.assertNotEqual(order[-1], "old-bulk")
+
+    def test_per_priority_stats(self):
+        jobs = [{'name': i, 'priority': i % 2, 'deadline': 0 if i == 3 else None} for i in range(6)]
+        _, sched = run(jobs, max_concurrency=2)
+        stats = sched.stats()
+        self.assertEqual(sorted(stats), [0, 1])
+        self.assertEqual([stats[p]['done'] for p in (0, 1)], [3, 3])
+        self.assertEqual(stats[1]['missed'], 1)
+        self.assertEqual(stats[0]['queued'], 0)
+        self.assertLess(stats[0]['wait_p95'], stats[1]['wait_p95'])
+        self.assertGreaterEqual(stats[1]['latency_p50'], stats[1]['wait_p50'])
+
+    def test_failure_cancels_queued_branches(self):
+        jobs = [{'name': "bad", 'fail': True, 'delay': 0}] + [{'name': i} for i in range(5)]
+        sched = PriorityScheduler(max_concurrency=2)
+        shared = {'jobs': jobs, 'order': []}
+        with self.assertRaises(RuntimeError):
+            asyncio.run(Jobs(start=Work(), scheduler=sched).run_async(shared))
+        self.assertEqual(shared['order'][:2], ["bad", 0])
+        self.assertLess(len(shared['order']), 4)
+        self.assertEqual((sched.running, sched.queued), (0, 0))
+
+    def test_flow_runner_priorities(self):
+        class Record(AsyncNode):
+            async def prep_async(self, shared_storage):
+                shared_storage['order'].append(shared_storage['name'])
+                await asyncio.sleep(0.01)
+        sched = PriorityScheduler(max_concurrency=1)
+        runner = FlowRunner(AsyncFlow(start=Record()), scheduler=sched)
+        order = []
+        async def main():
+            runs = [runner.submit({'order': order, 'name': n}, priority=p) for n, p in (("a", 3), ("b", 2), ("c", 1), ("d", 0))]
+            await runner.join()
+            return runs
+        runs = asyncio.run(main())
+        self.assertTrue(all(r.status == "done" for r in runs))
+        self.assertEqual(order, ["d", "c", "b", "a"])
+        self.assertEqual(sched.stats()[0]['done'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
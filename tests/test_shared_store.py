@@ -0,0 +1,155 @@
+import unittest
+import asyncio
+import pickle
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, AsyncNode, AsyncParallelBatchFlow
+from pocketflow.pool import ThreadPoolBatchFlow
+from pocketflow.store import SharedStore
+
+class LoadImage(AsyncNode):
+    async def post_async(self, shared_storage, prep_result, exec_result):
+        shared_storage['image'] = self.params['image']
+        await asyncio.sleep(0.01)
+        return "filter"
+
+class ApplyFilter(AsyncNode):
+    async def prep_async(self, shared_storage):
+        await asyncio.sleep(0.01)
+        return shared_storage['image']
+    async def post_async(self, shared_storage, prep_result, exec_result):
+        shared_storage.append('out', (self.params['image'], prep_result))
+        shared_storage.incr('count')
+
+class SyncLoad(Node):
+    def post(self, shared_storage, prep_result, exec_result):
+        shared_storage['image'] = self.params['image']
+        time.sleep(0.01)
+
+class SyncCheck(Node):
+    def post(self, shared_storage, prep_result, exec_result):
+        shared_storage.append('out', (self.params['image'], shared_storage['image']))
+
+class Images(AsyncParallelBatchFlow):
+    async def prep_async(self, shared_storage):
+        return [{'image': i} for i in range(10)]
+
+class ThreadImages(ThreadPoolBatchFlow):
+    def prep(self, shared_storage):
+        return [{'image': i} for i in range(10)]
+
+class TestSharedStore(unittest.TestCase):
+    def test_mapping_and_helpers(self):
+        s = SharedStore({'a': 1})
+        s['b'] = 2
+        self.assertEqual(dict(s), {'a': 1, 'b': 2})
+        self.assertEqual(s.incr('n', 5), 5)
+        self.assertEqual(s.apply('a', lambda v: v * 10), 10)
+        self.assertEqual(s.append('xs', 1), [1])
+        self.assertEqual(s.setdefault('a', 0), 10)
+        self.assertIs(s.lock('a'), s.lock('a'))
+
+    def test_incr_is_atomic_across_threads(self):
+        s = SharedStore()
+        def work():
+            for _ in range(2000):
+                s.apply('n', lambda v: (time.sleep(0) or v + 1), 0)
+        ts = [threading.Thread(target=work) for _ in range(4)]
+        for t in ts: t.start()
+        for t in ts: t.join()
+        self.assertEqual(s['n'], 8000)
+
+    def test_async_lock_and_apply(self):
+        s = SharedStore({'n': 0})
+        async def bump():
+            async def slow_add(v):
+                await asyncio.sleep(0.001)
+                return v + 1
+            await s.apply_async('n', slow_add)
+        async def main():
+            await asyncio.gather(*(bump() for _ in range(20)))
+        asyncio.run(main())
+        self.assertEqual(s['n'], 20)
+
+    def test_async_apply_with_concurrent_sync_helpers(self):
+        s = SharedStore({'k': 0})
+        async def slow_add(v):
+            await asyncio.sleep(0.01)
+            return v + 10
+        async def sync_bumps():
+            for _ in range(3):
+                s.incr('k')
+                await asyncio.sleep(0.002)
+        async def main():
+            t = threading.Thread(target=lambda: [s.incr('k') for _ in range(100)])
+            t.start()
+            await asyncio.gather(s.apply_async('k', slow_add), sync_bumps())
+            t.join()
+        asyncio.run(asyncio.wait_for(main(), 5))
+        self.assertEqual(s['k'], 113)
+
+    def test_async_lock_does_not_block_sync_section(self):
+        s = SharedStore()
+        async def holder(entered):
+            async with s.lock('k'):
+                entered.set()
+                await asyncio.sleep(0.02)
+        async def main():
+            entered = asyncio.Event()
+            task = asyncio.ensure_future(holder(entered))
+            await entered.wait()
+            with s.lock('k'):
+                s['k'] = 1
+            await task
+        asyncio.run(asyncio.wait_for(main(), 5))
+        self.assertEqual(s['k'], 1)
+
+    def test_branch_overlay(self):
+        s = SharedStore({'image': 'default', 'x': 1}, local=['image'])
+        b = s.branch(3)
+        self.assertEqual(b['image'], 'default')
+        b['image'] = 'mine'
+        b['x'] = 2
+        self.assertEqual((b['image'], s['image'], s['x']), ('mine', 'default', 2))
+        self.assertIs(b.root, s)
+        self.assertEqual(b.key, 3)
+
+    def test_pickle_roundtrip(self):
+        s = pickle.loads(pickle.dumps(SharedStore({'a': [1]}, local=['tmp'])))
+        self.assertEqual(dict(s), {'a': [1]})
+        self.assertEqual(s.local, frozenset(['tmp']))
+
+class TestBranchPerIteration(unittest.TestCase):
+    def test_async_parallel_batch_flow(self):
+        load = LoadImage()
+        load - "filter" >> ApplyFilter()
+        shared = SharedStore(local=['image'])
+        asyncio.run(Images(start=load).run_async(shared))
+        self.assertEqual(sorted(shared['out']), [(i, i) for i in range(10)])
+        self.assertEqual(shared['count'], 10)
+        self.assertNotIn('image', shared)
+
+    def test_thread_pool_batch_flow(self):
+        load = SyncLoad()
+        load >> SyncCheck()
+        shared = SharedStore(local=['image'])
+        ThreadImages(start=load, max_workers=5).run(shared)
+        self.assertEqual(sorted(shared['out']), [(i, i) for i in range(10)])
+        self.assertNotIn('image', shared)
+
+    def test_plain_dict_still_shared(self):
+        class Recorder(ApplyFilter):
+            async def post_async(self, shared_storage, prep_result, exec_result):
+                shared_storage.setdefault('out', []).append((self.params['image'], prep_result))
+        load = LoadImage()
+        load - "filter" >> Recorder()
+        shared = {}
+        asyncio.run(Images(start=load).run_async(shared))
+        self.assertNotEqual(sorted(shared['out']), [(i, i) for i in range(10)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import AsyncNode, AsyncFlow, AsyncParallelBatchNode
+from pocketflow.cache import SingleFlight, LRUCache
+
+class EmbedQuery(AsyncNode):
+    def __init__(self, delay=0.02, fail=False, **kwargs):
+        super().__init__(**kwargs)
+        self.delay, self.fail, self.calls = delay, fail, 0
+    async def prep_async(self, shared_storage):
+        return shared_storage['query']
+    async def exec_async(self, query):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(query)
+        return f"vec({query})"
+    async def post_async(self, shared_storage, prep_res, exec_res):
+        shared_storage['vec'] = exec_res
+
+def run_all(flow, queries):
+    runs = [{'query': q} for q in queries]
+    async def main():
+        return await asyncio.gather(*(flow.run_async(s) for s in runs), return_exceptions=True)
+    return runs, asyncio.run(main())
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_identical_calls_share_one_exec(self):
+        node = EmbedQuery(coalesce=SingleFlight())
+        runs, _ = run_all(AsyncFlow(start=node), ["q"] * 20 + ["other"] * 5)
+        self.assertEqual(node.calls, 2)
+        self.assertEqual([s['vec'] for s in runs], ["vec(q)"] * 20 + ["vec(other)"] * 5)
+        sf = node.coalesce
+        self.assertEqual((sf.calls, sf.executions, sf.coalesced), (25, 2, 23))
+        self.assertAlmostEqual(sf.ratio, 23 / 25)
+        self.assertEqual(sf.in_flight, 0)
+
+    def test_sequential_calls_run_again_unless_retained(self):
+        node = EmbedQuery(delay=0, coalesce=SingleFlight())
+        flow = AsyncFlow(start=node)
+        for _ in range(3):
+            asyncio.run(flow.run_async({'query': "q"}))
+        self.assertEqual(node.calls, 3)
+        node = EmbedQuery(delay=0, coalesce=SingleFlight(retain=0.05))
+        flow = AsyncFlow(start=node)
+        async def main():
+            for _ in range(3):
+                await flow.run_async({'query': "q"})
+            await asyncio.sleep(0.06)
+            await flow.run_async({'query': "q"})
+        asyncio.run(main())
+        self.assertEqual(node.calls, 2)
+        self.assertEqual(node.coalesce.coalesced, 2)
+
+    def test_failures_are_shared_and_not_retained(self):
+        node = EmbedQuery(fail=True, coalesce=SingleFlight(retain=10))
+        _, results = run_all(AsyncFlow(start=node), ["q"] * 3)
+        self.assertEqual(node.calls, 1)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        run_all(AsyncFlow(start=node), ["q"])
+        self.assertEqual(node.calls, 2)
+
+    def test_cancelling_one_waiter_keeps_the_call(self):
+        node = EmbedQuery(delay=0.05, coalesce=SingleFlight())
+        flow = AsyncFlow(start=node)
+        async def main():
+            a, b = {'query': "q"}, {'query': "q"}
+            ta, tb = asyncio.ensure_future(flow.run_async(a)), asyncio.ensure_future(flow.run_async(b))
+            await asyncio.sleep(0.01)
+            ta.cancel()
+            await tb
+            lone = asyncio.ensure_future(flow.run_async({'query': "z"}))
+            await asyncio.sleep(0.01)
+            lone.cancel()
+            await asyncio.gather(ta, lone, return_exceptions=True)
+            await asyncio.sleep(0)
+            return ta, b
+        ta, b = asyncio.run(main())
+        self.assertTrue(ta.cancelled())
+        self.assertEqual(b['vec'], "vec(q)")
+        self.assertEqual(node.calls, 2)
+        self.assertEqual(node.coalesce.in_flight, 0)
+
+    def test_duplicate_items_in_a_parallel_batch(self):
+        class Items(AsyncParallelBatchNode):
+            async def exec_async(self, item):
+                self.calls.append(item)
+                await asyncio.sleep(0.01)
+                return item * 2
+        node = Items(coalesce=SingleFlight())
+        node.calls = []
+        self.assertEqual(asyncio.run(node._exec([1, 2, 1, 1, 2])), [2, 4, 2, 2, 4])
+        self.assertEqual(sorted(node.calls), [1, 2])
+
+    def test_cache_hits_skip_coalescing(self):
+        node = EmbedQuery(delay=0, cache=LRUCache(), coalesce=SingleFlight())
+        flow = AsyncFlow(start=node)
+        for _ in range(2):
+            asyncio.run(flow.run_async({'query': "q"}))
+        self.assertEqual((node.calls, node.coalesce.calls, node.cache.hits), (1, 1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Flow
+from pocketflow.stream import StreamBatchNode, AsyncStreamBatchNode
+
+class Tracker:
+    def __init__(self):
+        self.produced = self.consumed = self.peak = 0
+    def produce(self, n):
+        for i in range(n):
+            self.produced += 1
+            self.peak = max(self.peak, self.produced - self.consumed)
+            yield i
+
+class SumSquares(StreamBatchNode):
+    def prep(self, shared_storage):
+        return shared_storage['tracker'].produce(shared_storage['n'])
+    def exec(self, x):
+        return x * x
+    def post_stream(self, shared_storage, prep_result, results):
+        total = 0
+        for r in results:
+            shared_storage['tracker'].consumed += 1
+            total += r
+        shared_storage['total'] = total
+        return "done"
+
+class ListPost(StreamBatchNode):
+    def prep(self, shared_storage):
+        return iter(shared_storage['items'])
+    def exec(self, x):
+        if x < 0:
+            raise ValueError("negative")
+        return x + 1
+    def exec_fallback(self, x, exc):
+        return None
+    def post(self, shared_storage, prep_result, exec_result):
+        shared_storage['results'] = exec_result
+
+class TestStreamBatchNode(unittest.TestCase):
+    def test_streams_one_item_at_a_time(self):
+        shared = {'tracker': Tracker(), 'n': 1000}
+        self.assertEqual(Flow(start=SumSquares()).run(shared), "done")
+        self.assertEqual(shared['total'], sum(i * i for i in range(1000)))
+        self.assertEqual(shared['tracker'].peak, 1)
+
+    def test_default_post_stream_materializes(self):
+        shared = {'items': [1, -1, 2]}
+        ListPost().run(shared)
+        self.assertEqual(shared['results'], [2, None, 3])
+
+    def test_empty(self):
+        shared = {'items': []}
+        ListPost().run(shared)
+        self.assertEqual(shared['results'], [])
+
+class AsyncEmbed(AsyncStreamBatchNode):
+    async def prep_async(self, shared_storage):
+        async def gen():
+            for i in range(shared_storage['n']):
+                shared_storage['produced'] += 1
+                yield i
+        return gen()
+    async def exec_async(self, x):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.001 * (x % 3))
+        self.active -= 1
+        return x * 10
+    async def post_stream_async(self, shared_storage, prep_result, results):
+        out = []
+        async for r in results:
+            shared_storage['lag'] = max(shared_storage['lag'], shared_storage['produced'] - len(out) - 1)
+            out.append(r)
+        shared_storage['results'] = out
+
+class TestAsyncStreamBatchNode(unittest.TestCase):
+    def run_node(self, node, n):
+        node.active = node.peak = 0
+        shared = {'n': n, 'produced': 0, 'lag': 0}
+        asyncio.run(node.run_async(shared))
+        return shared
+
+    def test_ordered_with_bounded_window(self):
+        node = AsyncEmbed(window=4)
+        shared = self.run_node(node, 50)
+        self.assertEqual(shared['results'], [i * 10 for i in range(50)])
+        self.assertEqual(node.peak, 4)
+        self.assertLessEqual(shared['lag'], 4)
+
+    def test_window_one_is_sequential(self):
+        node = AsyncEmbed()
+        shared = self.run_node(node, 10)
+        self.assertEqual(shared['results'], [i * 10 for i in range(10)])
+        self.assertEqual(node.peak, 1)
+
+    def test_default_post_stream_and_sync_iterables(self):
+        class Doubler(AsyncStreamBatchNode):
+            async def prep_async(self, shared_storage): return [1, 2, 3]
+            async def exec_async(self, x): return x * 2
+            async def post_async(self, shared_storage, prep_result, exec_result):
+                shared_storage['results'] = exec_result
+        shared = {}
+        asyncio.run(Doubler(window=2).run_async(shared))
+        self.assertEqual(shared['results'], [2, 4, 6])
+
+    def test_early_exit_cancels_in_flight(self):
+        cancelled = []
+        class Slow(AsyncStreamBatchNode):
+            async def prep_async(self, shared_storage): return range(10)
+            async def exec_async(self, x):
+                try:
+                    await asyncio.sleep(0 if x == 0 else 1)
+                except asyncio.CancelledError:
+                    cancelled.append(x)
+                    raise
+                return x
+            async def post_stream_async(self, shared_storage, prep_result, results):
+                async for r in results:
+                    shared_storage['first'] = r
+                    break
+                await results.aclose()
+        shared = {}
+        asyncio.run(Slow(window=3).run_async(shared))
+        self.assertEqual(shared['first'], 0)
+        self.assertEqual(sorted(cancelled), [1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
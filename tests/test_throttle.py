@@ -0,0 +1,111 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import AsyncNode, AsyncFlow, AsyncParallelBatchNode, AsyncParallelBatchFlow, Throttle
+
+class PeakNode(AsyncParallelBatchNode):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.active = self.peak = 0
+    async def prep_async(self, shared_storage):
+        return shared_storage['items']
+    async def exec_async(self, item):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return item * 2
+    async def post_async(self, shared_storage, prep_result, exec_result):
+        shared_storage['results'] = exec_result
+
+class TestThrottledParallelBatchNode(unittest.TestCase):
+    def test_max_concurrency(self):
+        node = PeakNode(max_concurrency=3)
+        shared = {'items': list(range(20))}
+        asyncio.run(node.run_async(shared))
+        self.assertEqual(shared['results'], [i * 2 for i in range(20)])
+        self.assertEqual(node.peak, 3)
+        self.assertEqual((node.throttle.in_flight, node.throttle.queued), (0, 0))
+
+    def test_unbounded_by_default(self):
+        node = PeakNode()
+        self.assertIsNone(node.throttle)
+        asyncio.run(node.run_async({'items': list(range(20))}))
+        self.assertEqual(node.peak, 20)
+
+    def test_rate_limit(self):
+        node = PeakNode(rate_limit=(50, 1))
+        start = time.monotonic()
+        asyncio.run(node.run_async({'items': list(range(6))}))
+        # one token up front, then one every 20ms
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_retries_count_against_budget(self):
+        class CountingThrottle(Throttle):
+            entries = 0
+            async def __aenter__(self):
+                self.entries += 1
+                return await super().__aenter__()
+        class FailOnce(AsyncParallelBatchNode):
+            async def prep_async(self, shared_storage):
+                self.attempts = {}
+                return [1, 2, 3]
+            async def exec_async(self, item):
+                self.attempts[item] = self.attempts.get(item, 0) + 1
+                if self.attempts[item] == 1:
+                    raise ValueError("first attempt fails")
+                return item
+            async def post_async(self, shared_storage, prep_result, exec_result):
+                shared_storage['results'] = exec_result
+        node = FailOnce(max_retries=2)
+        node.throttle = CountingThrottle(max_concurrency=2)
+        shared = {}
+        asyncio.run(node.run_async(shared))
+        self.assertEqual(shared['results'], [1, 2, 3])
+        self.assertEqual(node.throttle.entries, 6)
+
+    def test_observable_counts(self):
+        node = PeakNode(max_concurrency=2)
+        seen = []
+        async def main():
+            task = asyncio.ensure_future(node.run_async({'items': list(range(6))}))
+            await asyncio.sleep(0.005)
+            seen.append((node.throttle.in_flight, node.throttle.queued))
+            await task
+        asyncio.run(main())
+        self.assertEqual(seen, [(2, 4)])
+
+class BranchNode(AsyncNode):
+    active = peak = 0
+    async def prep_async(self, shared_storage):
+        BranchNode.active += 1
+        BranchNode.peak = max(BranchNode.peak, BranchNode.active)
+        await asyncio.sleep(0.01)
+        BranchNode.active -= 1
+        shared_storage.setdefault('done', []).append(self.params['i'])
+
+class TestThrottledParallelBatchFlow(unittest.TestCase):
+    def test_max_concurrency_branches(self):
+        class Fanout(AsyncParallelBatchFlow):
+            async def prep_async(self, shared_storage):
+                return [{'i': i} for i in range(10)]
+        BranchNode.active = BranchNode.peak = 0
+        flow = Fanout(start=BranchNode(), max_concurrency=3)
+        shared = {}
+        asyncio.run(flow.run_async(shared))
+        self.assertEqual(sorted(shared['done']), list(range(10)))
+        self.assertEqual(BranchNode.peak, 3)
+
+    def test_reused_across_event_loops(self):
+        node = PeakNode(max_concurrency=2)
+        for _ in range(2):
+            shared = {'items': [1, 2, 3]}
+            asyncio.run(AsyncFlow(start=node).run_async(shared))
+            self.assertEqual(shared['results'], [2, 4, 6])
+
+if __name__ == '__main__':
+    unittest.main()
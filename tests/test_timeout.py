@@ -0,0 +1,164 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import pocketflow
+from pocketflow import Node, Flow, AsyncNode, AsyncFlow, AsyncParallelBatchNode, AsyncParallelBatchFlow, Retry, thread_pool
+
+class SlowAsync(AsyncNode):
+    def __init__(self, delays, **kwargs):
+        super().__init__(**kwargs)
+        self.delays = list(delays)
+        self.attempts = 0
+    async def exec_async(self, prep_res):
+        self.attempts += 1
+        await asyncio.sleep(self.delays.pop(0))
+        return "ok"
+    async def exec_fallback_async(self, prep_res, exc):
+        return type(exc).__name__
+    async def post_async(self, shared_storage, prep_res, exec_res):
+        shared_storage['result'] = exec_res
+
+class SlowSync(Node):
+    def __init__(self, delays, **kwargs):
+        super().__init__(**kwargs)
+        self.delays = list(delays)
+    def exec(self, prep_res):
+        time.sleep(self.delays.pop(0))
+        return "ok"
+    def exec_fallback(self, prep_res, exc):
+        return type(exc).__name__
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['result'] = exec_res
+
+class Record(AsyncNode):
+    async def prep_async(self, shared_storage):
+        shared_storage.setdefault('ran', []).append(self.params.get('i'))
+
+class Sleeper(AsyncNode):
+    async def prep_async(self, shared_storage):
+        await asyncio.sleep(self.params.get('delay', 1))
+
+class TestNodeTimeout(unittest.TestCase):
+    def test_async_timeout_is_retried(self):
+        node = SlowAsync([1, 0], max_retries=2, timeout=0.05)
+        shared = {}
+        asyncio.run(node.run_async(shared))
+        self.assertEqual(shared['result'], "ok")
+        self.assertEqual(node.attempts, 2)
+
+    def test_async_timeout_reaches_fallback(self):
+        node = SlowAsync([1, 1], max_retries=2, timeout=0.02)
+        shared = {}
+        asyncio.run(node.run_async(shared))
+        self.assertEqual(shared['result'], "TimeoutError")
+
+    def test_timeout_respects_retry_filter(self):
+        node = SlowAsync([1, 0], max_retries=3, timeout=0.02, retry=Retry(base=0, retry_on=(ValueError,)))
+        shared = {}
+        asyncio.run(node.run_async(shared))
+        self.assertEqual(shared['result'], "TimeoutError")
+        self.assertEqual(node.attempts, 1)
+
+    def test_parallel_batch_items_time_out_individually(self):
+        class Items(AsyncParallelBatchNode):
+            async def prep_async(self, shared_storage): return [0, 1, 0]
+            async def exec_async(self, d):
+                await asyncio.sleep(d)
+                return d
+            async def exec_fallback_async(self, d, exc): return "timeout"
+            async def post_async(self, shared_storage, p, e): shared_storage['results'] = e
+        shared = {}
+        start = time.monotonic()
+        asyncio.run(Items(timeout=0.05).run_async(shared))
+        self.assertEqual(shared['results'], [0, "timeout", 0])
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_sync_timeout(self):
+        node = SlowSync([0.5, 0], max_retries=2, timeout=0.05)
+        shared = {}
+        Flow(start=node).run(shared)
+        self.assertEqual(shared['result'], "ok")
+        node = SlowSync([0.5], timeout=0.05)
+        node.run(shared)
+        self.assertEqual(shared['result'], "TimeoutError")
+
+    def test_offloaded_sync_timeout_with_one_worker(self):
+        previous, pocketflow._threads[0] = pocketflow._threads[0], None
+        thread_pool(1)
+        try:
+            node = SlowSync([0.05, 0.05], max_retries=2, timeout=1)
+            shared = {}
+            start = time.monotonic()
+            asyncio.run(AsyncFlow(start=node, offload=True).run_async(shared))
+            self.assertEqual(shared['result'], "ok")
+            self.assertLess(time.monotonic() - start, 0.5)
+            # an abandoned attempt does not hold the shared pool's only worker
+            asyncio.run(AsyncFlow(start=SlowSync([0.5], timeout=0.02), offload=True).run_async(shared))
+            self.assertEqual(shared['result'], "TimeoutError")
+            self.assertEqual(thread_pool().submit(lambda: "free").result(0.2), "free")
+        finally:
+            pocketflow._threads[0].shutdown(wait=False)
+            pocketflow._threads[0] = previous
+
+class TestFlowDeadline(unittest.TestCase):
+    def test_flow_deadline_stops_successors(self):
+        slow = Sleeper()
+        slow >> Record()
+        shared = {}
+        with self.assertRaises(TimeoutError):
+            asyncio.run(AsyncFlow(start=slow, timeout=0.05).run_async(shared))
+        self.assertNotIn('ran', shared)
+
+    def test_parallel_branches_have_own_deadline(self):
+        class Fanout(AsyncParallelBatchFlow):
+            async def prep_async(self, shared_storage):
+                return [{'i': i, 'delay': 0.01} for i in range(3)]
+        start = Sleeper()
+        start >> Record()
+        shared = {}
+        asyncio.run(Fanout(start=start, timeout=0.5).run_async(shared))
+        self.assertEqual(sorted(shared['ran']), [0, 1, 2])
+
+    def test_cancellation_stops_scheduling(self):
+        for compiled in (False, True):
+            slow = Sleeper()
+            slow >> Record()
+            flow = AsyncFlow(start=slow)
+            if compiled:
+                flow.compile()
+            shared = {}
+            async def main():
+                task = asyncio.ensure_future(flow.run_async(shared))
+                await asyncio.sleep(0.02)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+                await asyncio.sleep(0.05)
+            asyncio.run(main())
+            self.assertNotIn('ran', shared)
+
+    def test_failed_branch_cancels_siblings(self):
+        class Boom(AsyncNode):
+            async def prep_async(self, shared_storage):
+                if self.params['i'] == 0:
+                    raise ValueError("boom")
+                await asyncio.sleep(0.1)
+        class Fanout(AsyncParallelBatchFlow):
+            async def prep_async(self, shared_storage):
+                return [{'i': i} for i in range(3)]
+        start = Boom()
+        start >> Record()
+        shared = {}
+        async def main():
+            with self.assertRaises(ValueError):
+                await Fanout(start=start).run_async(shared)
+            await asyncio.sleep(0.15)
+        asyncio.run(main())
+        self.assertNotIn('ran', shared)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, AsyncNode, AsyncFlow, Tracer, trace
+from pocketflow.tracing import StatsTracer, percentile
+from pocketflow.stream import StreamBatchNode, AsyncStreamBatchNode
+from pocketflow.fanout import FanOut, AsyncFanOut
+
+class Recorder(Tracer):
+    def __init__(self):
+        self.events = []
+    def on_node_start(self, node):
+        self.events.append(("start", type(node).__name__))
+    def on_node_end(self, node, action, timings, error):
+        self.events.append(("end", type(node).__name__, action, sorted(timings), type(error).__name__ if error else None))
+    def on_retry(self, node, attempt, exc, delay):
+        self.events.append(("retry", type(node).__name__, attempt))
+    def on_fallback(self, node, exc):
+        self.events.append(("fallback", type(node).__name__))
+    def on_transition(self, flow, node, action, nxt):
+        self.events.append(("hop", type(node).__name__, action, type(nxt).__name__ if nxt else None))
+
+class Load(Node):
+    def exec(self, prep_res):
+        time.sleep(0.002)
+    def post(self, shared_storage, prep_res, exec_res):
+        return "loaded"
+
+class Flaky(Node):
+    def exec(self, prep_res):
+        if self.cur_retry < 2:
+            raise ValueError("flaky")
+    def exec_fallback(self, prep_res, exc):
+        return "fb"
+
+class AsyncLoad(AsyncNode):
+    async def exec_async(self, prep_res):
+        await asyncio.sleep(0.001)
+
+PHASES = ["exec", "post", "prep", "total"]
+
+class TestTracing(unittest.TestCase):
+    def test_events_for_sync_flow(self):
+        load, flaky = Load(), Flaky(max_retries=2)
+        load - "loaded" >> flaky
+        rec = Recorder()
+        for compiled in (False, True):
+            rec.events.clear()
+            flow = Flow(start=load)
+            if compiled:
+                flow.compile()
+            with trace(rec):
+                flow.run({})
+            self.assertEqual(rec.events, [
+                ("start", "Load"), ("end", "Load", "loaded", PHASES, None), ("hop", "Load", "loaded", "Flaky"),
+                ("start", "Flaky"), ("retry", "Flaky", 0), ("fallback", "Flaky"),
+                ("end", "Flaky", None, PHASES, None), ("hop", "Flaky", None, None)])
+
+    def test_disabled_outside_scope(self):
+        rec = Recorder()
+        with trace(rec):
+            pass
+        Flow(start=Load()).run({})
+        self.assertEqual(rec.events, [])
+
+    def test_error_reported(self):
+        class Boom(Node):
+            def post(self, shared_storage, prep_res, exec_res):
+                raise KeyError("x")
+        rec = Recorder()
+        with trace(rec), self.assertRaises(KeyError):
+            Boom().run({})
+        self.assertEqual(rec.events[-1], ("end", "Boom", None, ["exec", "prep", "total"], "KeyError"))
+
+    def test_async_and_offloaded_nodes(self):
+        start = AsyncLoad()
+        start >> Load()
+        rec = Recorder()
+        async def main():
+            with trace(rec):
+                await AsyncFlow(start=start, offload=True).run_async({})
+        asyncio.run(main())
+        self.assertEqual([e[:2] for e in rec.events], [
+            ("start", "AsyncLoad"), ("end", "AsyncLoad"), ("hop", "AsyncLoad"),
+            ("start", "Load"), ("end", "Load"), ("hop", "Load")])
+
+class TestStatsTracer(unittest.TestCase):
+    def test_percentile(self):
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(percentile(list(range(1, 101)), 50), 50)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 99)
+        self.assertEqual(percentile([3], 95), 3)
+
+    def test_aggregates_per_node_class(self):
+        load, flaky = Load(), Flaky(max_retries=3)
+        load - "loaded" >> flaky
+        stats = StatsTracer()
+        with trace(stats):
+            for _ in range(5):
+                Flow(start=load).run({})
+        summary = stats.summary()
+        self.assertEqual(summary['Load']['count'], 5)
+        self.assertEqual(summary['Load']['actions'], {"loaded": 5})
+        self.assertGreaterEqual(summary['Load']['exec_p50'], 0.002)
+        self.assertLessEqual(summary['Load']['total_p50'], summary['Load']['total_p99'])
+        self.assertEqual((summary['Flaky']['retries'], summary['Flaky']['fallbacks']), (10, 0))
+        self.assertEqual(stats.transitions[("Load", "loaded", "Flaky")], 5)
+        self.assertIn("Flaky", stats.report())
+
+    def test_stream_and_fanout_nodes_are_traced(self):
+        class Lines(StreamBatchNode):
+            def prep(self, shared_storage):
+                return iter("abc")
+        class AsyncLines(AsyncStreamBatchNode):
+            async def prep_async(self, shared_storage):
+                return "abc"
+        stats = StatsTracer()
+        with trace(stats):
+            Lines().run({})
+            FanOut(Load(), Load()).run({})
+            asyncio.run(AsyncLines().run_async({}))
+            asyncio.run(AsyncFanOut(AsyncLoad(), Load()).run_async({}))
+        summary = stats.summary()
+        for name in ("Lines", "AsyncLines", "FanOut", "AsyncFanOut"):
+            self.assertEqual(summary[name]['count'], 1, name)
+            self.assertIsNotNone(summary[name]['exec_p50'], name)
+        self.assertEqual(summary['Load']['count'], 3)
+        self.assertGreaterEqual(summary['FanOut']['exec_p50'], 0.002)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, AsyncNode, AsyncParallelBatchFlow
+from pocketflow.store import TrackedStore
+from pocketflow.checkpoint import Checkpointer
+
+class Load(Node):
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['doc'] = "some text"
+        del shared_storage['stale']
+
+class Embed(Node):
+    def prep(self, shared_storage):
+        return shared_storage['doc']
+    def exec(self, doc):
+        return len(doc)
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['vec'] = exec_res
+        shared_storage.append('log', "embedded")
+
+class Summarize(Node):
+    def prep(self, shared_storage):
+        return shared_storage['doc'], shared_storage.get('vec')
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['summary'] = prep_res[0][:4]
+
+class Blob:
+    """Counts how often it is pickled."""
+    pickled = 0
+    def __init__(self, n):
+        self.n = n
+    def __getstate__(self):
+        Blob.pickled += 1
+        return self.__dict__
+
+class Step(Node):
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['step'] = shared_storage.get('step', 0) + 1
+
+def pipeline():
+    load, embed, summarize = Load(), Embed(), Summarize()
+    load >> embed >> summarize
+    return Flow(start=load), load, embed, summarize
+
+class TestTrackedStore(unittest.TestCase):
+    def test_reads_and_writes_per_node(self):
+        flow, load, embed, summarize = pipeline()
+        shared = TrackedStore({'stale': 1})
+        flow.run(shared)
+        self.assertEqual([a.node for a in shared.history], [load, embed, summarize])
+        self.assertEqual(len({a.run_id for a in shared.history}), 1)
+        self.assertEqual(shared.write_set(load), {'doc', 'stale'})
+        self.assertEqual(shared.history[0].deletes, {'stale'})
+        self.assertEqual(shared.write_set(embed), {'vec', 'log'})
+        self.assertEqual(shared.readers('doc'), [embed, summarize])
+        self.assertEqual(shared.writers('doc'), [load])
+        self.assertEqual(shared.readers('vec'), [summarize])
+        self.assertEqual(shared.writers('stale'), [load])
+
+    def test_changes_and_deltas(self):
+        shared = TrackedStore({'a': 1, 'b': 2, 'big': [0] * 1000})
+        self.assertEqual(shared.changes()[0].keys(), {'a', 'b', 'big'})
+        mark = shared.version
+        shared['a'] = 10
+        del shared['b']
+        shared['c'] = 3
+        self.assertEqual(shared.changes(mark), ({'a': 10, 'c': 3}, {'b'}))
+        blob = shared.dump_changes(mark)
+        replica = TrackedStore({'a': 1, 'b': 2, 'big': [0] * 1000})
+        self.assertEqual(replica.load_changes(blob), shared.version)
+        self.assertEqual(dict(replica), dict(shared))
+        self.assertEqual(shared.changes(shared.version), ({}, set()))
+
+    def test_in_place_mutation_needs_touch(self):
+        shared = TrackedStore({'items': []})
+        mark = shared.version
+        shared['items'].append(1)
+        self.assertEqual(shared.changes(mark), ({}, set()))
+        shared.touch('items')
+        self.assertEqual(shared.changes(mark)[0], {'items': [1]})
+
+    def test_parallel_branches_are_separate(self):
+        class Write(AsyncNode):
+            async def post_async(self, shared_storage, prep_res, exec_res):
+                await asyncio.sleep(0.01 * (2 - self.params['i']))
+                shared_storage[f"out{self.params['i']}"] = self.params['i']
+        class Items(AsyncParallelBatchFlow):
+            async def prep_async(self, shared_storage):
+                return [{'i': 0}, {'i': 1}]
+        node = Write()
+        shared = TrackedStore()
+        asyncio.run(Items(start=node).run_async(shared))
+        writes = [a.writes for a in shared.history if a.node is node]
+        self.assertEqual(sorted(map(sorted, writes)), [['out0'], ['out1']])
+        self.assertEqual(shared.write_set(node), {'out0', 'out1'})
+
+    def test_keeps_a_bounded_history(self):
+        shared = TrackedStore(keep=3)
+        for _ in range(5):
+            Step().run(shared)
+        self.assertEqual(len(shared.history), 3)
+        self.assertEqual(shared['step'], 5)
+
+    def test_incremental_checkpoints(self):
+        class Memory:
+            def save(self, checkpoint):
+                self.checkpoint = checkpoint
+        a, b = Step(), Step()
+        a >> b
+        flow = Flow(start=a)
+        flow.checkpointer = Checkpointer(Memory(), incremental=True)
+        shared = TrackedStore({'index': Blob(1)})
+        Blob.pickled = 0
+        flow.run(shared)
+        self.assertEqual(Blob.pickled, 1)
+        restored = flow.checkpointer.restore(flow.checkpointer.store.checkpoint)
+        self.assertEqual((restored['step'], restored['index'].n), (2, 1))
+        Blob.pickled = 0
+        flow.run(shared)
+        self.assertEqual(Blob.pickled, 1)
+
+if __name__ == '__main__':
+    unittest.main()
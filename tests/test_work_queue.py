@@ -0,0 +1,149 @@
+import unittest
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node
+from pocketflow.workqueue import SQLiteQueue, QueueBatchFlow, ItemsFailed
+
+class Square(Node):
+    def prep(self, shared_storage):
+        return self.params['n']
+    def exec(self, n):
+        if n in self.params.get('fail', ()):
+            raise ValueError(n)
+        time.sleep(self.params.get('delay', 0))
+        return n * n
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage.setdefault('seen', []).append(prep_res)
+        shared_storage['last'] = exec_res
+
+class Squares(QueueBatchFlow):
+    def prep(self, shared_storage):
+        return [{'n': n} for n in range(shared_storage['count'])]
+    def post_item(self, shared_storage, params, result):
+        return (shared_storage['last'], os.getpid())
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['results'] = exec_res
+
+def work(path, delay):
+    flow = Squares(start=Square(), queue=SQLiteQueue(path, job="squares"), poll=0.01)
+    flow.set_params({'delay': delay})
+    flow.work()
+
+class TestSQLiteQueue(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "queue.db")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_lease_ack_and_progress(self):
+        q = SQLiteQueue(self.path, job="j")
+        self.assertEqual(q.put([{'n': 1}, {'n': 2}, {'n': 3}]), 3)
+        self.assertEqual(q.put([{'n': 1}, {'n': 2}, {'n': 3}]), 0)
+        a, b = q.lease(2, worker="w1")
+        self.assertEqual((a.id, a.params, a.attempts), (0, {'n': 1}, 1))
+        self.assertTrue(q.ack(a, "one"))
+        self.assertTrue(q.nack(b, "oops", delay=60))
+        self.assertEqual(q.progress(), {'pending': 2, 'leased': 0, 'expired': 0, 'done': 1, 'failed': 0, 'total': 3})
+        self.assertEqual([l.id for l in q.lease(5)], [2])
+        self.assertEqual(q.results(), {0: "one"})
+        self.assertEqual(SQLiteQueue(self.path, job="other").progress()['total'], 0)
+
+    def test_expired_lease_is_redelivered_and_stale_ack_rejected(self):
+        q = SQLiteQueue(self.path, visibility=0.05)
+        q.put([{'n': 1}])
+        crashed = q.lease()[0]
+        self.assertEqual(q.lease(), [])
+        time.sleep(0.1)
+        self.assertEqual(q.progress()['expired'], 1)
+        again = q.lease()[0]
+        self.assertEqual((again.id, again.attempts), (0, 2))
+        self.assertFalse(q.ack(crashed, "late"))
+        self.assertTrue(q.ack(again, "ok"))
+        self.assertEqual(q.results(), {0: "ok"})
+
+    def test_gives_up_after_max_attempts(self):
+        q = SQLiteQueue(self.path, visibility=0.01, max_attempts=2)
+        q.put([{'n': 1}, {'n': 2}])
+        first, second = q.lease(2)
+        q.nack(first, "bad")
+        time.sleep(0.02)
+        self.assertEqual([l.attempts for l in q.lease(2)], [2, 2])
+        time.sleep(0.02)
+        self.assertEqual(q.lease(2), [])
+        self.assertEqual(q.failures(), {0: "lease expired", 1: "lease expired"})
+
+class TestQueueBatchFlow(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "queue.db")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_run_in_one_process(self):
+        flow = Squares(start=Square(), queue=SQLiteQueue(self.path, job="squares"))
+        shared = {'count': 5}
+        flow.run(shared)
+        self.assertEqual([r[0] for r in shared['results']], [0, 1, 4, 9, 16])
+        self.assertEqual(flow.queue.progress()['done'], 5)
+
+    def test_resume_skips_finished_items(self):
+        q = SQLiteQueue(self.path, job="squares")
+        q.put([{'n': n} for n in range(4)])
+        for lease in q.lease(2):
+            q.ack(lease, (lease.params['n'] ** 2, 0))
+        shared = {'count': 4}
+        Squares(start=Square(), queue=q).run(shared)
+        self.assertEqual(shared['seen'], [2, 3])
+        self.assertEqual([r[0] for r in shared['results']], [0, 1, 4, 9])
+
+    def test_changed_items_are_rejected(self):
+        q = SQLiteQueue(self.path, job="squares")
+        Squares(start=Square(), queue=q).run({'count': 3})
+        with self.assertRaisesRegex(ValueError, "index 1"):
+            q.put([{'n': 0}, {'n': 7}, {'n': 2}])
+        shared = {'count': 4}
+        with self.assertRaisesRegex(ValueError, "index 3"):
+            Squares(start=Square(), queue=q).run(shared)
+        self.assertNotIn('seen', shared)
+        q.clear()
+        Squares(start=Square(), queue=q).run(shared)
+        self.assertEqual([r[0] for r in shared['results']], [0, 1, 4, 9])
+
+    def test_failed_items_raise_after_retries(self):
+        flow = Squares(start=Square(), queue=SQLiteQueue(self.path, max_attempts=2))
+        flow.set_params({'fail': {1}})
+        shared = {'count': 3}
+        with self.assertRaises(ItemsFailed) as cm:
+            flow.run(shared)
+        self.assertEqual(cm.exception.errors, {1: "ValueError: 1"})
+        self.assertEqual(shared['seen'], [0, 2])
+        self.assertEqual(flow.queue.progress()['failed'], 1)
+
+    def test_worker_processes_share_the_queue(self):
+        q = SQLiteQueue(self.path, job="squares", visibility=5)
+        q.put([{'n': n} for n in range(12)])
+        ctx = multiprocessing.get_context("spawn")
+        workers = [ctx.Process(target=work, args=(self.path, 0.05)) for _ in range(2)]
+        for w in workers:
+            w.start()
+        shared = {'count': 12}
+        flow = Squares(start=Square(), queue=q, poll=0.01)
+        flow.set_params({'delay': 0.05})
+        flow.run(shared)
+        for w in workers:
+            w.join(30)
+        self.assertEqual([r[0] for r in shared['results']], [n * n for n in range(12)])
+        self.assertGreater(len({r[1] for r in shared['results']}), 1)
+        self.assertEqual(q.progress()['done'], 12)
+
+if __name__ == '__main__':
+    unittest.main()